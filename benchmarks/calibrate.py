@@ -0,0 +1,94 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from macro import RobloxMacroBackend
+from vision import REGION_TEMPLATES, generate_corpus, load_corpus
+
+
+def calibrate(backend, corpus, confidence, margin, repeat):
+    """Scores every matcher on every template's labelled samples and picks the fastest one that separates them.
+
+    A matcher separates a template when every sample showing it scores at least confidence + margin and
+    every other sample scores at most confidence - margin. Also returns each matcher's highest non-match
+    score per template, which load_config uses to reject modes that would report false positives.
+    """
+    rows, choices, calibration = [], {}, {}
+    for region_name, samples in corpus.items():
+        for key in REGION_TEMPLATES[region_name]:
+            template = backend.templates.get(key)
+            if template is None or not any(key in present for _, present in samples):
+                continue
+            candidates = []
+            for mode, matcher in backend.matchers.items():
+                hits, misses, latencies = [], [], []
+                for image, present in samples:
+                    for _ in range(repeat):
+                        started = time.perf_counter()
+                        score, _ = matcher(template, image)
+                        latencies.append(time.perf_counter() - started)
+                    (hits if key in present else misses).append(score)
+                lowest_hit = min(hits)
+                highest_miss = max(misses) if misses else -1.0
+                separates = lowest_hit >= confidence + margin and highest_miss <= confidence - margin
+                p50_ms = float(np.percentile(latencies, 50)) * 1000
+                rows.append((key, mode, p50_ms, lowest_hit, highest_miss, separates))
+                if misses:
+                    calibration.setdefault(key, {})[mode] = round(highest_miss, 4)
+                if separates:
+                    candidates.append((p50_ms, mode))
+            choices[key] = min(candidates)[1] if candidates else "exhaustive"
+    return rows, choices, calibration
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pick the fastest matcher per template that still separates "
+                                                 "hits from misses on the vision corpus.")
+    parser.add_argument("--corpus", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus"),
+                        help="directory of <Region>/labels.json plus screenshots")
+    parser.add_argument("--generate", action="store_true",
+                        help="(re)build a synthetic corpus from the simulator first; calibrate on real captures "
+                             "before trusting the choices on the live game")
+    parser.add_argument("--confidence", type=float, default=RobloxMacroBackend.MATCH_CONFIDENCE)
+    parser.add_argument("--margin", type=float, default=0.05)
+    parser.add_argument("--repeat", type=int, default=3, help="timed calls per sample")
+    parser.add_argument("--write", action="store_true",
+                        help="store the choices as match_modes, and the worst non-match scores as match_calibration, "
+                             "in config.json")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    backend = RobloxMacroBackend()
+    if args.generate or not os.path.isdir(args.corpus):
+        generate_corpus(backend, args.corpus, args.seed)
+    corpus = load_corpus(args.corpus)
+    if not corpus:
+        sys.exit(f"No labelled samples under {args.corpus}")
+
+    rows, choices, calibration = calibrate(backend, corpus, args.confidence, args.margin, args.repeat)
+    print(f"{'template':<20}{'matcher':<12}{'p50 ms':>9}{'min hit':>9}{'max miss':>10}  separates")
+    for key, mode, p50_ms, lowest_hit, highest_miss, separates in rows:
+        marker = " <" if choices.get(key) == mode else ""
+        print(f"{key:<20}{mode:<12}{p50_ms:>9.2f}{lowest_hit:>9.3f}{highest_miss:>10.3f}  "
+              f"{'yes' if separates else 'no'}{marker}")
+
+    if args.write:
+        path = os.path.join(backend.data_dir, "config.json")
+        settings = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                settings = json.load(f)
+        settings["match_modes"] = {**settings.get("match_modes", {}), **choices}
+        settings["match_calibration"] = {**settings.get("match_calibration", {}), **calibration}
+        with open(path, "w") as f:
+            json.dump(settings, f, indent=2)
+        print(f"Wrote match_modes for {len(choices)} templates to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import argparse
+import collections
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from macro import PACK_COLORS, PACK_FULL_NAMES, AsyncMacroEngine, RobloxMacroBackend
+from simulator import attach_simulator
+
+
+class BenchSignals:
+    class _Log:
+        def __init__(self, verbose):
+            self.verbose = verbose
+            self.errors = 0
+            self.started = time.perf_counter()
+
+        def emit(self, message, tag):
+            if tag == "error":
+                self.errors += 1
+            if self.verbose:
+                print(f"{time.perf_counter() - self.started:8.2f}s [{tag}] {message}")
+
+    def __init__(self, verbose):
+        self.log_updated = self._Log(verbose)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run macro_loop against the shop simulator and report throughput.")
+    parser.add_argument("--cycles", type=int, default=3)
+    parser.add_argument("--packs", nargs="*", default=list(PACK_COLORS),
+                        help="short pack names to select, e.g. Dragon Demon")
+    parser.add_argument("--stock", type=int, default=3, help="stock per pack after each restock")
+    parser.add_argument("--restock-period", type=float, default=4.0)
+    parser.add_argument("--latency", type=float, default=0.15, help="simulated menu open delay")
+    parser.add_argument("--purchase-mode", choices=("sequential", "concurrent"), default="sequential")
+    parser.add_argument("--click-rate", type=float, default=12.0, help="clicks per second in concurrent mode")
+    parser.add_argument("--capture-fps", type=float, default=0, help="grab on a background thread at this rate")
+    parser.add_argument("--engine", choices=("threaded", "asyncio"), default="threaded")
+    parser.add_argument("--no-restock-schedule", action="store_true",
+                        help="watch for restocks at full rate the whole time instead of idling until the predicted one")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    backend = RobloxMacroBackend()
+    backend.purchase_mode, backend.click_rate = args.purchase_mode, args.click_rate
+    backend.capture_fps = args.capture_fps
+    simulator = attach_simulator(backend, stock_per_pack=args.stock,
+                                 restock_period=args.restock_period, latency=args.latency)
+    if args.no_restock_schedule:
+        backend.restock_schedule.seconds_until_window = lambda now: None
+    signals = BenchSignals(args.verbose)
+
+    phase_times = collections.defaultdict(list)
+    cycle_starts = []
+    current = {"phase": None, "since": time.perf_counter()}
+    enter_phase = backend.enter_phase
+
+    def timed_enter_phase(signals, phase):
+        now = time.perf_counter()
+        if current["phase"] is not None:
+            phase_times[current["phase"]].append(now - current["since"])
+        current["phase"], current["since"] = phase, now
+        enter_phase(signals, phase)
+        if phase == "purchase":
+            cycle_starts.append(now)
+            if backend.cycle > args.cycles:
+                backend.running = False
+
+    backend.enter_phase = timed_enter_phase
+    detections = []
+    restock_seen = backend.restock_seen
+
+    def timed_restock_seen(last_sample, sample):
+        detections.append(time.perf_counter())
+        restock_seen(last_sample, sample)
+
+    backend.restock_seen = timed_restock_seen
+    backend.running = True
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    selected_packs = [PACK_FULL_NAMES[name] for name in args.packs]
+    if args.engine == "asyncio":
+        AsyncMacroEngine(backend).run(signals, selected_packs)
+    else:
+        backend.macro_loop(signals, selected_packs)
+    elapsed = time.perf_counter() - started
+    cpu_seconds = time.process_time() - cpu_started
+
+    cycle_times = [b - a for a, b in zip(cycle_starts, cycle_starts[1:])]
+    stats = simulator.stats
+    print(f"cycles: {len(cycle_times)}  elapsed: {elapsed:.1f}s  cpu: {cpu_seconds:.1f}s  "
+          f"errors logged: {signals.log_updated.errors}")
+    if cycle_times:
+        print(f"cycle time: mean {sum(cycle_times) / len(cycle_times):.2f}s  "
+              f"min {min(cycle_times):.2f}s  max {max(cycle_times):.2f}s")
+    for phase, durations in phase_times.items():
+        print(f"  {phase:<10}{sum(durations) / len(durations):8.2f}s per cycle")
+    print(f"packs bought: {stats['packs_bought']}  ({3600 * stats['packs_bought'] / elapsed:.0f} per hour)")
+    print(f"wasted actions: {stats['wasted_clicks']} clicks, {stats['wasted_keys']} keys, "
+          f"{stats['wasted_scrolls']} scrolls  (of {stats['clicks']} clicks, {stats['keys']} keys, "
+          f"{stats['scrolls']} scrolls)")
+    schedule = backend.restock_schedule
+    buy_delays = simulator.restock_delays
+    seen_delays = [seen - max(t for t in simulator.restocks if t <= seen) for seen in detections
+                   if any(t <= seen for t in simulator.restocks)]
+    print(f"restock watch: {backend.metrics.counters['restock_polls']} polls"
+          + (f", learned period {schedule.period:.2f}s" if schedule.period else ""))
+    if seen_delays:
+        print(f"  seen {1000 * sum(seen_delays) / len(seen_delays):.0f}ms after restock (mean), "
+              f"{1000 * max(seen_delays):.0f}ms worst of {len(seen_delays)}")
+    if buy_delays:
+        print(f"  first pack bought {sum(buy_delays) / len(buy_delays):.2f}s after restock (mean)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from macro import PACK_COLORS, PACK_FULL_NAMES
+from simulator import simulated_coordinator
+from cycles import BenchSignals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run several simulated game instances through one input arbiter.")
+    parser.add_argument("--instances", type=int, nargs="+", default=[1, 2, 3], help="instance counts to compare")
+    parser.add_argument("--seconds", type=float, default=40.0, help="run time per instance count")
+    parser.add_argument("--packs", nargs="*", default=list(PACK_COLORS),
+                        help="short pack names to select, e.g. Dragon Demon")
+    parser.add_argument("--restock-period", type=float, default=4.0)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    selected_packs = [PACK_FULL_NAMES[name] for name in args.packs]
+    print(f"{'instances':>9}{'packs':>8}{'packs/h':>10}{'per instance':>14}{'switches':>10}{'wasted':>8}{'errors':>8}")
+    for count in args.instances:
+        coordinator, simulators = simulated_coordinator(count, restock_period=args.restock_period)
+        signals = BenchSignals(args.verbose)
+        deadline = time.perf_counter() + args.seconds
+        runner = threading.Thread(target=coordinator.run, args=(signals, selected_packs),
+                                  kwargs={"keep_running": lambda: time.perf_counter() < deadline})
+        started = time.perf_counter()
+        runner.start()
+        runner.join()
+        elapsed = time.perf_counter() - started
+
+        bought = sum(simulator.stats["packs_bought"] for simulator in simulators)
+        wasted = sum(simulator.stats["wasted_clicks"] + simulator.stats["wasted_keys"]
+                     + simulator.stats["wasted_scrolls"] for simulator in simulators)
+        per_hour = 3600 * bought / elapsed
+        print(f"{count:>9}{bought:>8}{per_hour:>10.0f}{per_hour / count:>14.0f}"
+              f"{coordinator.arbiter.switches:>10}{wasted:>8}{signals.log_updated.errors:>8}")
+
+
+if __name__ == "__main__":
+    main()
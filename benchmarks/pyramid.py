@@ -0,0 +1,84 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from macro import PACK_FULL_NAMES, RobloxMacroBackend
+
+PACK_KEYS = [name.replace(" ", "") for name in PACK_FULL_NAMES.values()]
+
+
+def synthetic_frames(backend, count, seed):
+    rng = np.random.default_rng(seed)
+    _, _, width, height = backend.regions["PackFrame"]
+    frames = []
+    for _ in range(count):
+        noise = rng.integers(20, 90, (height // 8, width // 8, 3), dtype=np.uint8)
+        frame = cv2.resize(noise, (width, height), interpolation=cv2.INTER_CUBIC)
+        slots = list(range(0, height - 60, 110))
+        for y, key in zip(slots, random.Random(int(rng.integers(1 << 30))).sample(PACK_KEYS, len(slots))):
+            template = backend.templates[key]
+            x = int(rng.integers(10, width - template.width - 10))
+            frame[y + 10:y + 10 + template.height, x:x + template.width] = template.bgr
+        frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2BGRA))
+    return frames
+
+
+def load_frames(directory):
+    frames = []
+    for filename in sorted(os.listdir(directory)):
+        if filename.lower().endswith(".png"):
+            image = cv2.imread(os.path.join(directory, filename), cv2.IMREAD_COLOR)
+            frames.append(cv2.cvtColor(image, cv2.COLOR_BGR2BGRA))
+    return frames
+
+
+def timed(backend, mode, template, frame):
+    backend.match_modes[template.name] = mode
+    start = time.perf_counter()
+    max_val, max_loc = backend.match_in_view(template, frame)
+    return time.perf_counter() - start, max_val, max_loc
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare pyramid and exhaustive matching on PackFrame captures.")
+    parser.add_argument("--frames", help="directory of PackFrame-sized PNG screenshots")
+    parser.add_argument("--count", type=int, default=20, help="synthetic frames when --frames is not given")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--confidence", type=float, default=0.7)
+    args = parser.parse_args()
+
+    backend = RobloxMacroBackend()
+    frames = load_frames(args.frames) if args.frames else synthetic_frames(backend, args.count, args.seed)
+
+    print(f"{'template':<20}{'exhaustive ms':>15}{'pyramid ms':>12}{'speedup':>9}{'agree':>8}{'max dscore':>12}")
+    for key in PACK_KEYS:
+        template = backend.templates.get(key)
+        if template is None:
+            continue
+        full_times, pyramid_times, agree, max_delta = [], [], 0, 0.0
+        for frame in frames:
+            full_time, full_val, full_loc = timed(backend, "exhaustive", template, frame)
+            pyramid_time, pyramid_val, pyramid_loc = timed(backend, "pyramid", template, frame)
+            full_times.append(full_time)
+            pyramid_times.append(pyramid_time)
+            full_hit = full_val >= args.confidence
+            pyramid_hit = pyramid_val >= args.confidence
+            same_place = abs(full_loc[0] - pyramid_loc[0]) <= 1 and abs(full_loc[1] - pyramid_loc[1]) <= 1
+            if full_hit == pyramid_hit and (not full_hit or same_place):
+                agree += 1
+            if full_hit:
+                max_delta = max(max_delta, abs(full_val - pyramid_val))
+        full_ms = 1000 * float(np.median(full_times))
+        pyramid_ms = 1000 * float(np.median(pyramid_times))
+        print(f"{key:<20}{full_ms:>15.2f}{pyramid_ms:>12.2f}{full_ms / pyramid_ms:>8.1f}x"
+              f"{agree:>5}/{len(frames):<3}{max_delta:>11.4f}")
+
+
+if __name__ == "__main__":
+    main()
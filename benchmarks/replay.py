@@ -0,0 +1,57 @@
+import argparse
+import collections
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from macro import ReplayCapture, RobloxMacroBackend
+
+
+def timed(samples, name, call):
+    start = time.perf_counter()
+    result = call()
+    samples[name].append(time.perf_counter() - start)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile the vision decision path on a recorded session.")
+    parser.add_argument("recording", help="session directory written by RecordingCapture")
+    parser.add_argument("--repeat", type=int, default=1, help="passes over the recording")
+    args = parser.parse_args()
+
+    backend = RobloxMacroBackend()
+    backend.running = True
+    replay = ReplayCapture(args.recording, speed=0)
+    backend.capture = replay
+
+    snapshot_times = [entry["t"] for entry in replay.entries if tuple(entry["region"]) == backend.frame_region]
+    if not snapshot_times:
+        sys.exit("No full snapshots in this recording.")
+
+    samples = collections.defaultdict(list)
+    states = collections.Counter()
+    for _ in range(args.repeat):
+        for t in snapshot_times:
+            replay.seek(t)
+            backend.mark_input()
+            observation = timed(samples, "classify_ui_state", lambda: backend.classify_ui_state(None))
+            states[observation.state] += 1
+            if observation.state in ("summon_shop", "out_of_stock"):
+                timed(samples, "locate_all_packs", lambda: backend.locate_all_packs(None))
+                timed(samples, "is_pack_out_of_stock", lambda: backend.is_pack_out_of_stock(None))
+
+    print(f"{len(snapshot_times)} snapshots x {args.repeat}: " +
+          ", ".join(f"{state}={count}" for state, count in states.most_common()))
+    print(f"{'call':<24}{'n':>6}{'p50 ms':>10}{'p99 ms':>10}{'mean ms':>10}")
+    for name, values in samples.items():
+        values_ms = np.array(values) * 1000
+        print(f"{name:<24}{len(values):>6}{np.percentile(values_ms, 50):>10.2f}"
+              f"{np.percentile(values_ms, 99):>10.2f}{values_ms.mean():>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
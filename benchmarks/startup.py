@@ -0,0 +1,76 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Each probe runs in a fresh interpreter so module imports and file caches start cold for Python.
+PROBE = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+started = time.perf_counter()
+import macro
+if not {bundle}:
+    macro.RobloxMacroBackend.TEMPLATE_BUNDLE = "no-bundle"
+imported = time.perf_counter()
+backend = macro.RobloxMacroBackend()
+constructed = time.perf_counter()
+window_shown = None
+if {window}:
+    import gui
+    app = gui.QApplication(sys.argv)
+    window = gui.MainWindow(backend)
+    window.show()
+    app.processEvents()
+    window_shown = time.perf_counter() - started
+preload_started = time.perf_counter()
+macro.preload_modules()
+modules_loaded = time.perf_counter()
+backend.templates.load()
+print(json.dumps({{
+    "import_ms": (imported - started) * 1000,
+    "backend_ms": (constructed - imported) * 1000,
+    "window_ms": window_shown * 1000 if window_shown is not None else None,
+    "preload_ms": (modules_loaded - preload_started) * 1000,
+    "templates_ms": (time.perf_counter() - modules_loaded) * 1000,
+}}))
+"""
+
+
+def probe(bundle, window):
+    code = PROBE.format(root=ROOT, bundle=bundle, window=window)
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen"))
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start timings: module import, backend construction, first "
+                                                 "window, and template loading with and without the bundle.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--window", action="store_true", help="also time creating and showing MainWindow")
+    args = parser.parse_args()
+
+    if not os.path.exists(os.path.join(ROOT, "images", "templates.json")):
+        sys.exit("No template bundle; run `python macro.py --build-template-bundle` first.")
+
+    print("import, backend and window happen before the window appears; preload and templates run after it, "
+          "on a background thread, in the order the GUI runs them.")
+    print(f"{'templates':<12}{'import ms':>11}{'backend ms':>12}{'window ms':>11}{'preload ms':>12}{'templates ms':>14}")
+    for label, bundle in (("bundle", True), ("png decode", False)):
+        runs = [probe(bundle, args.window) for _ in range(args.runs)]
+
+        def median(field):
+            values = [run[field] for run in runs if run[field] is not None]
+            return f"{np.median(values):.1f}" if values else "--"
+
+        print(f"{label:<12}{median('import_ms'):>11}{median('backend_ms'):>12}{median('window_ms'):>11}"
+              f"{median('preload_ms'):>12}{median('templates_ms'):>14}")
+
+
+if __name__ == "__main__":
+    main()
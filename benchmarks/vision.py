@@ -0,0 +1,224 @@
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from macro import PACK_FULL_NAMES, FrameSnapshot, RobloxMacroBackend
+from simulator import ShopSimulator
+
+PACK_KEYS = [name.replace(" ", "") for name in PACK_FULL_NAMES.values()]
+REGION_TEMPLATES = {
+    "PackFrame": PACK_KEYS,
+    "PurchaseLocation": ["NoStock"],
+    "SummonScreen": ["SummonScreen"],
+    "XButton": ["XButton"],
+    "SummonButton": ["SummonButton"],
+    "SellButton": ["SellButton"],
+    "SellInv": ["SellInv"],
+}
+REGION_CHECKS = {
+    "PurchaseLocation": ("is_pack_out_of_stock", lambda backend: backend.is_pack_out_of_stock(None)),
+    "SummonScreen": ("is_summon_screen_open", lambda backend: backend.is_summon_screen_open(None)),
+    "PackFrame": ("locate_all_packs", lambda backend: backend.locate_all_packs(None)),
+}
+
+
+class StaticCapture:
+    def __init__(self, image, region):
+        self.pixels = image
+        self.region = region
+
+    def grab(self, region):
+        frame = FrameSnapshot(self.region[0], self.region[1], self.pixels, time.perf_counter())
+        return FrameSnapshot(region[0], region[1], frame.view(region), frame.timestamp)
+
+    def close(self):
+        pass
+
+
+def generate_corpus(backend, directory, seed):
+    """Writes labelled region screenshots taken from the simulator in every screen state."""
+    rng = np.random.default_rng(seed)
+    simulator = ShopSimulator(backend.image_dir, backend.regions, seed=seed)
+    labels = {region: {} for region in REGION_TEMPLATES}
+    states = []
+    for screen in ("world", "sell"):
+        states.append((screen, 0, None, 1))
+    for offset in range(0, simulator.max_scroll + 1, simulator.SCROLL_STEP):
+        for stock in (0, 1):
+            pack = simulator.pack_names[int(rng.integers(len(simulator.pack_names)))]
+            states.append(("shop", offset, pack, stock))
+
+    for n, (screen, offset, pack, stock) in enumerate(states):
+        simulator.screen, simulator.scroll_offset, simulator.selected_pack = screen, offset, pack
+        if pack:
+            simulator.stock[pack] = stock
+        simulator._frame = None
+        visible = {"SummonButton", "SellButton"}
+        if screen == "shop":
+            visible |= {"SummonScreen", "XButton"}
+            visible |= {name.replace(" ", "") for name, _, _, _ in simulator._pack_tiles()}
+            if pack and stock == 0:
+                visible.add("NoStock")
+        elif screen == "sell":
+            visible.add("SellInv")
+
+        for region_name, templates in REGION_TEMPLATES.items():
+            os.makedirs(os.path.join(directory, region_name), exist_ok=True)
+            filename = f"{n:03d}_{screen}.png"
+            pixels = simulator.grab(backend.regions[region_name])
+            cv2.imwrite(os.path.join(directory, region_name, filename), pixels)
+            labels[region_name][filename] = sorted(visible & set(templates))
+
+    for region_name, region_labels in labels.items():
+        with open(os.path.join(directory, region_name, "labels.json"), "w") as f:
+            json.dump(region_labels, f, indent=2)
+
+
+def load_corpus(directory):
+    corpus = {}
+    for region_name in REGION_TEMPLATES:
+        labels_path = os.path.join(directory, region_name, "labels.json")
+        if not os.path.exists(labels_path):
+            continue
+        with open(labels_path) as f:
+            labels = json.load(f)
+        samples = []
+        for filename, present in labels.items():
+            image = cv2.imread(os.path.join(directory, region_name, filename), cv2.IMREAD_COLOR)
+            samples.append((cv2.cvtColor(image, cv2.COLOR_BGR2BGRA), set(present)))
+        corpus[region_name] = samples
+    return corpus
+
+
+def measure(call, repeat):
+    latencies, peaks = [], []
+    for _ in range(repeat):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        result = call()
+        latencies.append(time.perf_counter() - start)
+        peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    return result, latencies, peaks
+
+
+def summarize(latencies, peaks):
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(latencies_ms, 50)), 3),
+        "p99_ms": round(float(np.percentile(latencies_ms, 99)), 3),
+        "alloc_kib": round(float(np.mean(peaks)) / 1024, 1),
+    }
+
+
+def run(backend, corpus, repeat, confidence):
+    results = {"confidence": confidence, "templates": {}, "checks": {}}
+    tracemalloc.start()
+    for region_name, samples in corpus.items():
+        region = backend.regions[region_name]
+        check_latencies, check_peaks = [], []
+        for key in REGION_TEMPLATES[region_name]:
+            template = backend.templates.get(key)
+            if template is None:
+                continue
+            latencies, peaks = [], []
+            counts = {"tp": 0, "fp": 0, "fn": 0, "tn": 0}
+            for image, present in samples:
+                backend.capture = StaticCapture(image, region)
+                found, sample_latencies, sample_peaks = measure(
+                    lambda: backend.find_image_in_region(None, template, region, confidence), repeat)
+                latencies += sample_latencies
+                peaks += sample_peaks
+                hit, expected = found is not None, key in present
+                counts[("t" if hit == expected else "f") + ("p" if hit else "n")] += 1
+            results["templates"][key] = {"region": region_name, "samples": len(samples),
+                                         **summarize(latencies, peaks), **counts}
+
+        if region_name in REGION_CHECKS:
+            name, check = REGION_CHECKS[region_name]
+            for image, _ in samples:
+                backend.capture = StaticCapture(image, region)
+                _, sample_latencies, sample_peaks = measure(lambda: check(backend), repeat)
+                check_latencies += sample_latencies
+                check_peaks += sample_peaks
+            results["checks"][name] = {"region": region_name, **summarize(check_latencies, check_peaks)}
+    tracemalloc.stop()
+    return results
+
+
+def print_report(results, baseline):
+    def delta(section, name, field, value):
+        if not baseline or name not in baseline.get(section, {}):
+            return ""
+        old = baseline[section][name][field]
+        return f" ({(value - old) / old * 100:+.0f}%)" if old else ""
+
+    print(f"{'template':<20}{'region':<18}{'p50 ms':>16}{'p99 ms':>16}{'alloc KiB':>12}"
+          f"{'TP':>5}{'FP':>5}{'FN':>5}{'TN':>5}")
+    for name, row in results["templates"].items():
+        p50 = f"{row['p50_ms']:.2f}{delta('templates', name, 'p50_ms', row['p50_ms'])}"
+        p99 = f"{row['p99_ms']:.2f}{delta('templates', name, 'p99_ms', row['p99_ms'])}"
+        print(f"{name:<20}{row['region']:<18}{p50:>16}{p99:>16}{row['alloc_kib']:>12.1f}"
+              f"{row['tp']:>5}{row['fp']:>5}{row['fn']:>5}{row['tn']:>5}")
+        if baseline and name in baseline["templates"]:
+            old = baseline["templates"][name]
+            changed = [field for field in ("tp", "fp", "fn", "tn") if old[field] != row[field]]
+            if changed:
+                print("  ! accuracy changed vs baseline: " +
+                      ", ".join(f"{field} {old[field]}->{row[field]}" for field in changed))
+    print()
+    print(f"{'check':<24}{'p50 ms':>16}{'p99 ms':>16}{'alloc KiB':>12}")
+    for name, row in results["checks"].items():
+        p50 = f"{row['p50_ms']:.2f}{delta('checks', name, 'p50_ms', row['p50_ms'])}"
+        p99 = f"{row['p99_ms']:.2f}{delta('checks', name, 'p99_ms', row['p99_ms'])}"
+        print(f"{name:<24}{p50:>16}{p99:>16}{row['alloc_kib']:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Latency and allocation benchmark for template matching. Accuracy columns are only meaningful "
+                    "on a corpus of real labelled captures; on the generated simulator corpus they measure "
+                    "templates matching themselves.")
+    parser.add_argument("--corpus", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus"),
+                        help="directory of <Region>/labels.json plus screenshots")
+    parser.add_argument("--generate", action="store_true",
+                        help="(re)build a synthetic corpus from the simulator first")
+    parser.add_argument("--repeat", type=int, default=5, help="timed calls per sample")
+    parser.add_argument("--confidence", type=float, default=0.7)
+    parser.add_argument("--save", help="write results as a JSON baseline")
+    parser.add_argument("--compare", help="baseline JSON saved with --save from the same corpus on this machine")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--memo", action="store_true", help="keep the match memo on, so repeats after the first are hits")
+    args = parser.parse_args()
+
+    backend = RobloxMacroBackend()
+    backend.running = True
+    if not args.memo:
+        backend.match_memo_size = 0
+    if args.generate or not os.path.isdir(args.corpus):
+        generate_corpus(backend, args.corpus, args.seed)
+    corpus = load_corpus(args.corpus)
+    if not corpus:
+        sys.exit(f"No labelled samples under {args.corpus}")
+
+    results = run(backend, corpus, args.repeat, args.confidence)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,499 @@
+import sys
+import os
+import threading
+
+from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
+                               QHBoxLayout, QLabel, QPushButton, QGridLayout,
+                               QFrame, QPlainTextEdit)
+from PySide6.QtCore import (QObject, Signal, Slot, QRunnable, QThreadPool, Qt, QTimer,
+                           QPoint)
+from PySide6.QtGui import (QFont, QColor, QKeySequence)
+
+from macro import (PACK_COLORS, PACK_FULL_NAMES, LogFileWriter, LogHistory, RobloxMacroBackend, format_log,
+                   keyboard, load_config, preload_modules, run_macro, save_config)
+
+if sys.platform == "win32":
+    os.environ["QT_ENABLE_HIGHDPI_SCALING"] = "1"
+
+class WorkerSignals(QObject):
+    """finished crosses to the Qt thread as a signal; log lines go straight into a LogHistory the window polls."""
+    finished = Signal()
+
+    def __init__(self, log_updated):
+        super().__init__()
+        self.log_updated = log_updated
+
+
+class MacroWorker(QRunnable):
+    def __init__(self, backend_instance, selected_packs, log_history):
+        super().__init__()
+        self.backend = backend_instance
+        self.selected_packs = selected_packs
+        self.signals = WorkerSignals(log_history)
+
+    @Slot()
+    def run(self):
+        run_macro(self.backend, self.signals, self.selected_packs)
+        self.signals.finished.emit()
+
+class PackButton(QPushButton):
+    def __init__(self, text, color, parent=None):
+        super().__init__(text, parent)
+        self.pack_color = color
+        self.is_selected = False
+        self.setFixedSize(110, 40)
+
+    def toggle_selection(self):
+        self.is_selected = not self.is_selected
+        self.update_style()
+
+    def update_style(self):
+        if self.is_selected:
+            bg_color = self.pack_color
+            border_color = self.adjust_brightness(self.pack_color, 40)
+        else:
+            bg_color = "#38384a"
+            border_color = "#4a4a5f"
+            
+        hover_color = self.adjust_brightness(bg_color, 20)
+        pressed_color = self.adjust_brightness(bg_color, -10)
+
+        self.setStyleSheet(f"""
+            PackButton {{
+                background-color: {bg_color};
+                border: 1px solid {border_color};
+                border-radius: 6px;
+                color: white;
+                font-weight: bold;
+                font-size: 10px;
+                text-transform: uppercase;
+            }}
+            PackButton:hover {{
+                background-color: {hover_color};
+                border: 1px solid {self.adjust_brightness(border_color, 20)};
+            }}
+            PackButton:pressed {{
+                background-color: {pressed_color};
+            }}
+        """)
+
+    def adjust_brightness(self, color, amount):
+        try:
+            if not color.startswith('#'):
+                return color
+            color_hex = color.lstrip('#')
+            if len(color_hex) == 3:
+                color_hex = "".join([c*2 for c in color_hex])
+            if len(color_hex) != 6:
+                return color
+            rgb = tuple(int(color_hex[i:i+2], 16) for i in (0, 2, 4))
+            rgb = tuple(max(0, min(255, c + amount)) for c in rgb)
+            return f"#{rgb[0]:02x}{rgb[1]:02x}{rgb[2]:02x}"
+        except (ValueError, TypeError):
+            return color
+
+class HotkeyCaptureButton(QPushButton):
+    hotkey_captured = Signal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.is_capturing = False
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self.is_capturing = True
+            self.setText("Press any key...")
+            self.setFocus()
+        super().mousePressEvent(event)
+
+    def keyPressEvent(self, event):
+        if self.is_capturing:
+            key_name = QKeySequence(event.key()).toString().lower()
+            self.is_capturing = False
+            self.hotkey_captured.emit(key_name)
+        else:
+            super().keyPressEvent(event)
+
+    def focusOutEvent(self, event):
+        self.is_capturing = False
+        super().focusOutEvent(event)
+
+class MainWindow(QMainWindow):
+    PACK_COLORS = PACK_COLORS
+    PACK_FULL_NAMES = PACK_FULL_NAMES
+
+    def __init__(self, backend):
+        super().__init__()
+        self.backend = backend
+        self.threadpool = QThreadPool()
+        self.pack_vars = {name: False for name in self.PACK_FULL_NAMES.values()}
+        self.current_start_hotkey = "f1"
+        self.current_stop_hotkey = "f2"
+        self.is_capturing_hotkey = None
+        self.pack_buttons = {}
+        self.dragPos = None
+        self.start_hotkey_ref = None
+        self.stop_hotkey_ref = None
+        self.log_history = LogHistory()
+        self.log_sequence = 0
+        self.log_writer = None
+
+        if getattr(sys, 'frozen', False):
+            self.config_file_path = os.path.join(os.path.dirname(sys.executable), 'config.json')
+        else:
+            self.config_file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.json')
+
+        self.setWindowFlags(Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint)
+        self.setAttribute(Qt.WA_TranslucentBackground) 
+
+        self.container = QWidget()
+        self.container_layout = QVBoxLayout(self.container)
+        self.container_layout.setContentsMargins(1, 1, 1, 1)
+        self.setCentralWidget(self.container)
+
+        self.initUI()
+        self.apply_styles()
+        self.stats_timer = QTimer(self)
+        self.stats_timer.timeout.connect(self.update_stats)
+        self.stats_timer.start(1000)
+        self.log_timer = QTimer(self)
+        self.log_timer.timeout.connect(self.refresh_log)
+        self.log_timer.start(100)
+        QTimer.singleShot(0, self.deferred_init)
+
+    def deferred_init(self):
+        """Loads settings and sets up hotkeys after the UI is shown."""
+        self.load_settings()
+        self.log_writer = LogFileWriter(self.log_history, self.backend.log_file)
+        self.setup_hotkeys()
+        self.update_pack_buttons()
+
+    def initUI(self):
+        content_widget = QWidget()
+        content_widget.setObjectName("ContentWidget")
+        self.container_layout.addWidget(content_widget)
+
+        main_layout = QVBoxLayout(content_widget)
+        main_layout.setSpacing(10)
+        main_layout.setContentsMargins(15, 0, 15, 15) 
+
+        self.initTitleBar(main_layout)
+
+        status_frame = QFrame()
+        status_frame.setObjectName("StatusFrame")
+        status_layout = QHBoxLayout(status_frame)
+        status_layout.setContentsMargins(10, 5, 10, 5)
+        
+        self.log_icon = QLabel("🟢")
+        self.log_icon.setFont(QFont("Segoe UI Emoji", 12))
+        self.log_text = QLabel("Ready to summon")
+        self.log_text.setObjectName("StatusText")
+        
+        self.history_btn = QPushButton("\uE81C")
+        self.history_btn.setObjectName("TitleBarButton")
+        self.history_btn.setFixedSize(24, 24)
+        self.history_btn.setCheckable(True)
+        self.history_btn.setToolTip("Log history")
+        self.history_btn.toggled.connect(self.toggle_history)
+
+        status_layout.addWidget(self.log_icon)
+        status_layout.addWidget(self.log_text, 1)
+        status_layout.addWidget(self.history_btn)
+        main_layout.addWidget(status_frame)
+
+        self.history_view = QPlainTextEdit()
+        self.history_view.setObjectName("HistoryView")
+        self.history_view.setReadOnly(True)
+        self.history_view.setMaximumBlockCount(self.log_history.capacity)
+        self.history_view.setFixedHeight(160)
+        self.history_view.hide()
+        main_layout.addWidget(self.history_view)
+
+        self.stats_text = QLabel(self.backend.metrics.summary_text())
+        self.stats_text.setObjectName("StatsText")
+        main_layout.addWidget(self.stats_text)
+
+        pack_frame = QFrame()
+        pack_frame.setObjectName("SectionFrame")
+        pack_layout = QVBoxLayout(pack_frame)
+        pack_grid = QGridLayout()
+        pack_grid.setSpacing(8)
+        
+        for i, (short_name, color) in enumerate(self.PACK_COLORS.items()):
+            row, col = i // 2, i % 2
+            full_name = self.PACK_FULL_NAMES[short_name]
+            pack_btn = PackButton(short_name, color)
+            pack_btn.clicked.connect(lambda c=False, p=full_name: self.toggle_pack(p))
+            pack_grid.addWidget(pack_btn, row, col)
+            self.pack_buttons[full_name] = pack_btn
+            
+        pack_layout.addLayout(pack_grid)
+        main_layout.addWidget(pack_frame)
+
+        hotkey_frame = QFrame()
+        hotkey_frame.setObjectName("SectionFrame")
+        hotkey_layout = QGridLayout(hotkey_frame)
+        hotkey_layout.setSpacing(10)
+        hotkey_layout.setColumnStretch(1, 1)
+
+        hotkey_layout.addWidget(QLabel("Start Hotkey:"), 0, 0)
+        self.start_hotkey_btn = HotkeyCaptureButton()
+        self.start_hotkey_btn.setObjectName("HotkeySetBtn")
+        self.start_hotkey_btn.hotkey_captured.connect(lambda key: self._finalize_hotkey_capture('start', key))
+        hotkey_layout.addWidget(self.start_hotkey_btn, 0, 1)
+        
+        hotkey_layout.addWidget(QLabel("Stop Hotkey:"), 1, 0)
+        self.stop_hotkey_btn = HotkeyCaptureButton()
+        self.stop_hotkey_btn.setObjectName("HotkeySetBtn")
+        self.stop_hotkey_btn.hotkey_captured.connect(lambda key: self._finalize_hotkey_capture('stop', key))
+        hotkey_layout.addWidget(self.stop_hotkey_btn, 1, 1)
+        
+        main_layout.addWidget(hotkey_frame)
+
+        self.control_btn = QPushButton()
+        self.control_btn.setFixedHeight(40)
+        self.control_btn.clicked.connect(self.toggle_macro)
+        main_layout.addWidget(self.control_btn)
+
+        self.update_control_button_style()
+
+    def initTitleBar(self, parent_layout):
+        self.title_bar = QWidget()
+        self.title_bar.setObjectName("TitleBar")
+        self.title_bar.setFixedHeight(35)
+        title_layout = QHBoxLayout(self.title_bar)
+        title_layout.setContentsMargins(10, 0, 5, 0)
+        title_layout.setSpacing(5)
+
+        title_label = QLabel("⚔️ Anime Boss Raid Macro")
+        title_label.setFont(QFont("Segoe UI", 9, QFont.Bold))
+        title_label.setStyleSheet("color: #a9a9d9;")
+        title_layout.addWidget(title_label)
+        title_layout.addStretch()
+
+        btn_size = 28
+        
+        self.minimize_btn = QPushButton("\uE921")
+        self.minimize_btn.setObjectName("TitleBarButton")
+        self.minimize_btn.setFixedSize(btn_size, btn_size)
+        self.minimize_btn.clicked.connect(self.showMinimized)
+
+        self.close_btn = QPushButton("\uE8BB")
+        self.close_btn.setObjectName("TitleBarButton")
+        self.close_btn.setFixedSize(btn_size, btn_size)
+        self.close_btn.clicked.connect(self.close)
+
+        title_layout.addWidget(self.minimize_btn)
+        title_layout.addWidget(self.close_btn)
+
+        parent_layout.addWidget(self.title_bar)
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton and self.title_bar.underMouse():
+            self.dragPos = event.globalPosition().toPoint()
+            event.accept()
+
+    def mouseMoveEvent(self, event):
+        if self.dragPos and event.buttons() == Qt.LeftButton:
+            self.move(self.pos() + event.globalPosition().toPoint() - self.dragPos)
+            self.dragPos = event.globalPosition().toPoint()
+            event.accept()
+
+    def mouseReleaseEvent(self, event):
+        self.dragPos = None
+        event.accept()
+
+    def apply_styles(self):
+        self.setStyleSheet("""
+            #ContentWidget {
+                background-color: #1e1e2d;
+                border: 1px solid #3c3c5a;
+                border-radius: 8px;
+            }
+            #TitleBar { background-color: transparent; }
+            #TitleBarButton {
+                background-color: transparent;
+                border: none; border-radius: 4px;
+                color: #e0e0e0; 
+                font-size: 10px;
+                font-family: 'Segoe Fluent Icons';
+            }
+            #TitleBarButton:hover { background-color: #4a4a5f; }
+            #TitleBarButton:pressed { background-color: #5a5a6f; }
+            #SectionFrame, #StatusFrame {
+                background-color: #2a2a3f;
+                border: 1px solid #3c3c5a;
+                border-radius: 8px; padding: 10px;
+            }
+            #StatusText, QLabel { font-size: 11px; font-weight: 500; }
+            #StatsText { font-size: 10px; color: #a9a9d9; padding-left: 4px; }
+            #HistoryView {
+                background-color: #2a2a3f; border: 1px solid #3c3c5a;
+                border-radius: 8px; color: #e0e0e0;
+                font-family: 'Consolas'; font-size: 9px;
+            }
+            #HotkeySetBtn {
+                background-color: #4a4a5f; border: 1px solid #666;
+                border-radius: 6px; padding: 8px;
+                font-size: 10px; font-weight: bold;
+            }
+            #HotkeySetBtn:hover { background-color: #5a5a6f; }
+            #StartButton {
+                background-color: #28a745; border: 1px solid #3cbf5d; color: white;
+            }
+            #StartButton:hover { background-color: #2ebf4f; }
+            #StopButton {
+                background-color: #dc3545; border: 1px solid #e45a66; color: white;
+            }
+            #StopButton:hover { background-color: #e44a59; }
+            #StartButton, #StopButton {
+                font-size: 11px; font-weight: bold;
+                border-radius: 8px; padding: 10px;
+                text-transform: uppercase;
+            }
+        """)
+
+    def toggle_macro(self):
+        if self.backend.running:
+            self.stop_macro()
+        else:
+            self.start_macro()
+
+    def update_control_button_style(self):
+        if self.backend.running:
+            self.control_btn.setObjectName("StopButton")
+            self.control_btn.setText("STOP")
+        else:
+            self.control_btn.setObjectName("StartButton")
+            self.control_btn.setText("START")
+        self.style().polish(self.control_btn)
+
+    def update_log(self, message, tag):
+        self.log_history.emit(message, tag)
+
+    @Slot()
+    def refresh_log(self):
+        """Shows the newest status line and appends new lines to the history, at most every log_timer tick."""
+        records = self.log_history.since(self.log_sequence)
+        if not records:
+            return
+        self.log_sequence = records[-1][0]
+        _, _, message, tag = records[-1]
+        icons = {'success': '🟢', 'error': '🔴', 'action': '🔍', 'info': '📦', 'wait': '👀', 'system': '⚙️'}
+        self.log_icon.setText(icons.get(tag, '⚙️'))
+        self.log_text.setText(message)
+        self.history_view.appendPlainText("\n".join(format_log(record) for record in records))
+
+    def toggle_history(self, visible):
+        self.history_view.setVisible(visible)
+        self.adjustSize()
+
+    @Slot()
+    def update_stats(self):
+        if self.backend.running:
+            self.stats_text.setText(self.backend.metrics.summary_text())
+
+    def toggle_pack(self, pack_name):
+        self.pack_vars[pack_name] = not self.pack_vars[pack_name]
+        self.pack_buttons[pack_name].toggle_selection()
+
+    def update_pack_buttons(self):
+        for full_name, button in self.pack_buttons.items():
+            if self.pack_vars.get(full_name, False):
+                button.is_selected = True
+            button.update_style()
+
+    def start_macro(self):
+        if self.backend.running: return
+        self.backend.running = True
+        self.update_log("Macro started.", 'system')
+        
+        selected_packs = [name for name, selected in self.pack_vars.items() if selected]
+        worker = MacroWorker(self.backend, selected_packs, self.log_history)
+        worker.signals.finished.connect(self.on_macro_finished)
+        self.threadpool.start(worker)
+        self.update_control_button_style()
+
+    def stop_macro(self):
+        if self.backend.running:
+            self.backend.running = False
+            self.update_log("Stopping macro...", 'system')
+    
+    @Slot()
+    def on_macro_finished(self):
+        self.backend.running = False
+        self.update_control_button_style()
+
+    def _finalize_hotkey_capture(self, target, hotkey):
+        if target == 'start' and hotkey == self.current_stop_hotkey:
+            self.update_log("Hotkey is already in use for Stop.", 'error')
+        elif target == 'stop' and hotkey == self.current_start_hotkey:
+            self.update_log("Hotkey is already in use for Start.", 'error')
+        else:
+            if target == 'start':
+                self.current_start_hotkey = hotkey
+            else:
+                self.current_stop_hotkey = hotkey
+            self.update_log(f"{target.capitalize()} hotkey set to '{hotkey.upper()}'", 'success')
+        
+        self.setup_hotkeys()
+
+    def setup_hotkeys(self):
+        if self.start_hotkey_ref:
+            try: keyboard.remove_hotkey(self.start_hotkey_ref)
+            except (KeyError, ValueError): pass
+        if self.stop_hotkey_ref:
+            try: keyboard.remove_hotkey(self.stop_hotkey_ref)
+            except (KeyError, ValueError): pass
+
+        self.start_hotkey_ref = keyboard.add_hotkey(self.current_start_hotkey, self.start_macro)
+        self.stop_hotkey_ref = keyboard.add_hotkey(self.current_stop_hotkey, self.stop_macro)
+        
+        self.start_hotkey_btn.setText(self.current_start_hotkey.upper())
+        self.stop_hotkey_btn.setText(self.current_stop_hotkey.upper())
+
+    def save_settings(self):
+        try:
+            save_config(self.backend, self.pack_vars, self.current_start_hotkey, self.current_stop_hotkey)
+        except Exception as e: print(f"Failed to save settings: {e}")
+
+    def load_settings(self):
+        try:
+            settings = load_config(self.backend)
+            self.pack_vars = settings.get('pack_vars', self.pack_vars)
+            hotkeys = settings.get('hotkeys', {})
+            self.current_start_hotkey = hotkeys.get('start', 'f1')
+            self.current_stop_hotkey = hotkeys.get('stop', 'f2')
+        except Exception as e: print(f"Failed to load settings: {e}")
+
+    def closeEvent(self, event):
+        self.save_settings()
+        self.backend.running = False
+        if self.log_writer:
+            self.log_writer.close()
+        
+        if self.start_hotkey_ref:
+            try: keyboard.remove_hotkey(self.start_hotkey_ref)
+            except (KeyError, ValueError): pass
+        if self.stop_hotkey_ref:
+            try: keyboard.remove_hotkey(self.stop_hotkey_ref)
+            except (KeyError, ValueError): pass
+            
+        event.accept()
+
+
+def main():
+    app = QApplication(sys.argv)
+    backend = RobloxMacroBackend()
+    window = MainWindow(backend)
+    window.show()
+
+    def preload():
+        preload_modules()
+        backend.templates.load()
+
+    threading.Thread(target=preload, daemon=True).start()
+    sys.exit(app.exec())
+
+if __name__ == "__main__":
+    main()
@@ -3,140 +3,854 @@ import threading
 import time
 import json
 import os
-import cv2
-import numpy as np
-import pydirectinput
-import pyautogui
-import keyboard
-import win32api
-import win32gui
-import win32con
 import math
 import random
-import mss
+import queue
+import bisect
+import itertools
+import collections
+import contextlib
+import zlib
+import argparse
+import statistics
 
-from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
-                               QHBoxLayout, QLabel, QPushButton, QGridLayout,
-                               QFrame)
-from PySide6.QtCore import (QObject, Signal, Slot, QRunnable, QThreadPool, Qt, QTimer,
-                           QPoint)
-from PySide6.QtGui import (QFont, QColor, QKeySequence)
 
-if sys.platform == "win32":
-    os.environ["QT_ENABLE_HIGHDPI_SCALING"] = "1"
+class LazyModule:
+    """Stands in for a module and calls its loader on first attribute access, so startup does not wait for it."""
 
-class WorkerSignals(QObject):
-    log_updated = Signal(str, str)
-    finished = Signal()
+    _lock = threading.Lock()
 
+    def __init__(self, loader):
+        self._loader = loader
+        self._module = None
 
-class MacroWorker(QRunnable):
-    def __init__(self, backend_instance, selected_packs):
-        super().__init__()
-        self.backend = backend_instance
-        self.selected_packs = selected_packs
-        self.signals = WorkerSignals()
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = self._loader()
+        return self._module
 
-    @Slot()
-    def run(self):
-        self.backend.macro_loop(self.signals, self.selected_packs)
-        self.signals.finished.emit()
+    def __getattr__(self, attribute):
+        return getattr(self._load(), attribute)
 
-class PackButton(QPushButton):
-    def __init__(self, text, color, parent=None):
-        super().__init__(text, parent)
-        self.pack_color = color
-        self.is_selected = False
-        self.setFixedSize(110, 40)
-
-    def toggle_selection(self):
-        self.is_selected = not self.is_selected
-        self.update_style()
-
-    def update_style(self):
-        if self.is_selected:
-            bg_color = self.pack_color
-            border_color = self.adjust_brightness(self.pack_color, 40)
-        else:
-            bg_color = "#38384a"
-            border_color = "#4a4a5f"
-            
-        hover_color = self.adjust_brightness(bg_color, 20)
-        pressed_color = self.adjust_brightness(bg_color, -10)
-
-        self.setStyleSheet(f"""
-            PackButton {{
-                background-color: {bg_color};
-                border: 1px solid {border_color};
-                border-radius: 6px;
-                color: white;
-                font-weight: bold;
-                font-size: 10px;
-                text-transform: uppercase;
-            }}
-            PackButton:hover {{
-                background-color: {hover_color};
-                border: 1px solid {self.adjust_brightness(border_color, 20)};
-            }}
-            PackButton:pressed {{
-                background-color: {pressed_color};
-            }}
-        """)
-
-    def adjust_brightness(self, color, amount):
+
+# Each loader imports by name, not through importlib, so PyInstaller still bundles the module.
+@LazyModule
+def cv2():
+    import cv2
+    return cv2
+
+
+@LazyModule
+def np():
+    import numpy
+    return numpy
+
+
+@LazyModule
+def keyboard():
+    import keyboard
+    return keyboard
+
+
+@LazyModule
+def mss():
+    import mss
+    return mss
+
+
+@LazyModule
+def pydirectinput():
+    import pydirectinput
+    return pydirectinput
+
+
+@LazyModule
+def win32api():
+    import win32api
+    return win32api
+
+
+@LazyModule
+def win32gui():
+    import win32gui
+    return win32gui
+
+
+@LazyModule
+def win32con():
+    import win32con
+    return win32con
+
+
+@LazyModule
+def asyncio():
+    import asyncio
+    return asyncio
+
+
+@LazyModule
+def futures():
+    import concurrent.futures
+    return concurrent.futures
+
+
+HEAVY_MODULES = (np, cv2, mss, keyboard, pydirectinput, win32api, win32gui, win32con)
+
+
+def preload_modules():
+    """Imports the heavy modules on a background thread while the window is already up."""
+    for module in HEAVY_MODULES:
         try:
-            if not color.startswith('#'):
-                return color
-            color_hex = color.lstrip('#')
-            if len(color_hex) == 3:
-                color_hex = "".join([c*2 for c in color_hex])
-            if len(color_hex) != 6:
-                return color
-            rgb = tuple(int(color_hex[i:i+2], 16) for i in (0, 2, 4))
-            rgb = tuple(max(0, min(255, c + amount)) for c in rgb)
-            return f"#{rgb[0]:02x}{rgb[1]:02x}{rgb[2]:02x}"
-        except (ValueError, TypeError):
-            return color
-
-class HotkeyCaptureButton(QPushButton):
-    hotkey_captured = Signal(str)
-
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.is_capturing = False
-
-    def mousePressEvent(self, event):
-        if event.button() == Qt.LeftButton:
-            self.is_capturing = True
-            self.setText("Press any key...")
-            self.setFocus()
-        super().mousePressEvent(event)
-
-    def keyPressEvent(self, event):
-        if self.is_capturing:
-            key_name = QKeySequence(event.key()).toString().lower()
-            self.is_capturing = False
-            self.hotkey_captured.emit(key_name)
-        else:
-            super().keyPressEvent(event)
+            module._load()
+        except ImportError:
+            pass
+
+
+PACK_COLORS = {
+    'Dragon': "#d9534f", 'Sorcerer': '#6100ca', 'Pirate': '#f0ad4e',
+    'Demon': '#00e53d', 'Hunter': '#db2100', 'Shinobi': '#bcbcbc'
+}
+PACK_FULL_NAMES = {
+    'Dragon': 'Dragon Realm Pack', 'Sorcerer': 'Sorcerer Realm Pack', 'Pirate': 'Pirate Realm Pack',
+    'Demon': 'Demon Realm Pack', 'Hunter': 'Hunter Realm Pack', 'Shinobi': 'Shinobi Realm Pack'
+}
+
+
+def region_contains(outer, inner):
+    """Whether the (left, top, width, height) region inner lies entirely inside outer."""
+    return (inner[0] >= outer[0] and inner[1] >= outer[1]
+            and inner[0] + inner[2] <= outer[0] + outer[2]
+            and inner[1] + inner[3] <= outer[1] + outer[3])
+
+
+class FrameSnapshot:
+    """A single screen grab whose pixels are shared, not copied, with every region check."""
+
+    __slots__ = ("left", "top", "width", "height", "timestamp", "pixels", "number", "_owner")
+
+    def __init__(self, left, top, pixels, timestamp, owner=None, number=None):
+        self.left = left
+        self.top = top
+        self.height, self.width = pixels.shape[:2]
+        self.timestamp = timestamp
+        self.pixels = pixels
+        self.number = number
+        self._owner = owner
+
+    @classmethod
+    def from_mss(cls, sct_img, timestamp):
+        pixels = np.frombuffer(sct_img.raw, dtype=np.uint8).reshape(sct_img.height, sct_img.width, 4)
+        return cls(sct_img.left, sct_img.top, pixels, timestamp, owner=sct_img)
+
+    @property
+    def region(self):
+        return (self.left, self.top, self.width, self.height)
+
+    def contains(self, region):
+        return region_contains(self.region, region)
+
+    def view(self, region):
+        x, y = region[0] - self.left, region[1] - self.top
+        return self.pixels[y:y + region[3], x:x + region[2]]
+
+
+class DirectInput:
+    """Sends input to the game through pydirectinput and win32 wheel events."""
+
+    def position(self):
+        return pydirectinput.position()
+
+    def move_to(self, x, y, duration=0.0):
+        pydirectinput.moveTo(x, y, duration=duration, _pause=False)
+
+    def click(self):
+        pydirectinput.click(_pause=False)
+
+    def key_down(self, key):
+        pydirectinput.keyDown(key)
+
+    def key_up(self, key):
+        pydirectinput.keyUp(key)
+
+    def scroll(self, x, y, notches):
+        win32api.mouse_event(win32con.MOUSEEVENTF_WHEEL, x, y, 120 * notches, 0)
+
+    def focus(self, window_handle, attempts=3):
+        if not window_handle:
+            return
+        for attempt in range(attempts):
+            try:
+                win32gui.SetForegroundWindow(window_handle)
+                return
+            except win32gui.error:
+                # Windows refuses the switch now and then while another process holds the foreground.
+                if attempt == attempts - 1:
+                    raise
+                time.sleep(0.05)
+
+    def turn(self):
+        return contextlib.nullcontext()
+
+
+class InputArbiter:
+    """Serialises input from several game instances onto one mouse and keyboard."""
+
+    def __init__(self, device):
+        self.device = device
+        self.lock = threading.RLock()
+        self.holder = None
+        self.switches = 0
+
+    def client(self, window_handle=None):
+        return ArbitratedInput(self, window_handle)
+
+    @contextlib.contextmanager
+    def turn(self, client):
+        with self.lock:
+            if self.holder is not client:
+                # Only hand over once focus and cursor are restored, so a failed switch is retried next turn.
+                self.holder = None
+                self.device.focus(client.window_handle)
+                self.device.move_to(*client.cursor)
+                self.holder = client
+                self.switches += 1
+            yield
+
+
+class ArbitratedInput:
+    def __init__(self, arbiter, window_handle):
+        self.arbiter = arbiter
+        self.window_handle = window_handle
+        self.cursor = tuple(arbiter.device.position())
+
+    def turn(self):
+        return self.arbiter.turn(self)
+
+    def position(self):
+        return self.cursor
+
+    def move_to(self, x, y, duration=0.0):
+        with self.turn():
+            self.arbiter.device.move_to(x, y, duration)
+            self.cursor = (x, y)
+
+    def click(self):
+        with self.turn():
+            self.arbiter.device.click()
+
+    def key_down(self, key):
+        with self.turn():
+            self.arbiter.device.key_down(key)
+
+    def key_up(self, key):
+        with self.turn():
+            self.arbiter.device.key_up(key)
+
+    def scroll(self, x, y, notches):
+        with self.turn():
+            self.arbiter.device.scroll(x, y, notches)
+
+
+class MssCapture:
+    """Grabs from the live screen. mss handles are not thread-safe, so each thread gets its own."""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._handles = []
+        self._lock = threading.Lock()
+
+    def grab(self, region):
+        sct = getattr(self._local, "sct", None)
+        if sct is None:
+            sct = self._local.sct = mss.mss()
+            with self._lock:
+                self._handles.append(sct)
+        monitor_region = {"top": region[1], "left": region[0], "width": region[2], "height": region[3]}
+        timestamp = time.perf_counter()
+        return FrameSnapshot.from_mss(sct.grab(monitor_region), timestamp)
+
+    def close(self):
+        """Closes the handles of every thread that grabbed; threads that grab again get new ones."""
+        with self._lock:
+            handles, self._handles = self._handles, []
+            self._local = threading.local()
+        for sct in handles:
+            sct.close()
+
+
+class RecordingCapture:
+    """Passes grabs through from another source and writes up to max_pending queued ones to a directory."""
+
+    def __init__(self, source, directory, max_pending=32):
+        self.source = source
+        self.directory = directory
+        os.makedirs(os.path.join(directory, "frames"), exist_ok=True)
+        self._index = open(os.path.join(directory, "frames.jsonl"), "w")
+        self._queue = queue.Queue(max_pending)
+        self._lock = threading.Lock()
+        self._count = 0
+        self.dropped = 0
+        self._started = None
+        self._writer = threading.Thread(target=self._write_frames, daemon=True)
+        self._writer.start()
+
+    def grab(self, region):
+        frame = self.source.grab(region)
+        with self._lock:
+            if self._queue.full():
+                self.dropped += 1
+                return frame
+            if self._started is None:
+                self._started = frame.timestamp
+            self._count += 1
+            self._queue.put((self._count, frame.timestamp - self._started, frame.region, frame.pixels.copy()))
+        return frame
+
+    def _write_frames(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            number, elapsed, region, pixels = item
+            filename = f"{number:06d}.npy"
+            np.save(os.path.join(self.directory, "frames", filename), pixels)
+            self._index.write(json.dumps({"t": round(elapsed, 6), "region": list(region), "file": filename}) + "\n")
+        self._index.close()
+
+    def close(self):
+        self._queue.put(None)
+        self._writer.join()
+        self.source.close()
+
+
+class ReplayCapture:
+    """Serves a recording back at real time (speed=1), faster, or frozen (speed=0, moved with seek).
+
+    Each grab is sliced out of the newest recorded frame that covers the requested region.
+    """
+
+    def __init__(self, directory, speed=1.0):
+        self.directory = directory
+        self.speed = speed
+        with open(os.path.join(directory, "frames.jsonl")) as f:
+            self.entries = [json.loads(line) for line in f if line.strip()]
+        self.times = [entry["t"] for entry in self.entries]
+        self._pixels = {}
+        self._anchor = None
+        self._position = 0.0
+
+    @property
+    def finished(self):
+        return self._anchor is not None and self.elapsed() > self.times[-1]
+
+    def elapsed(self):
+        return self._position + (time.perf_counter() - self._anchor) * self.speed
+
+    def seek(self, seconds):
+        self._position = seconds
+        self._anchor = time.perf_counter()
+
+    def _load(self, entry):
+        pixels = self._pixels.get(entry["file"])
+        if pixels is None:
+            pixels = np.load(os.path.join(self.directory, "frames", entry["file"]), mmap_mode="r")
+            self._pixels[entry["file"]] = pixels
+        return pixels
+
+    def grab(self, region):
+        if self._anchor is None:
+            self.seek(0.0)
+        current = bisect.bisect_right(self.times, self.elapsed())
+        order = itertools.chain(range(current - 1, -1, -1), range(current, len(self.entries)))
+        timestamp = time.perf_counter()
+        for i in order:
+            entry = self.entries[i]
+            if region_contains(entry["region"], region):
+                left, top = entry["region"][:2]
+                frame = FrameSnapshot(left, top, self._load(entry), timestamp)
+                return FrameSnapshot(region[0], region[1], frame.view(region), timestamp)
+        return FrameSnapshot(region[0], region[1], np.zeros((region[3], region[2], 4), np.uint8), timestamp)
+
+    def close(self):
+        self._pixels.clear()
+
+
+class FrameGrabber:
+    """Grabs one region from a capture source on its own thread, at up to fps, into a ring of preallocated frames.
+
+    Frames are numbered and stamped with the time their grab started. Slots are reused once the ring wraps,
+    so readers get a copy of the region they asked for, taken under the same lock the writer fills slots in.
+    """
+
+    def __init__(self, source, region, fps=30, slots=4, metrics=None, max_errors=10):
+        self.source = source
+        self.region = region
+        self.interval = 1.0 / fps
+        self.buffers = [np.empty((region[3], region[2], 4), np.uint8) for _ in range(slots)]
+        self.frames = [None] * slots
+        self.count = 0
+        self.metrics = metrics
+        self.max_errors = max_errors
+        self.errors = 0
+        self.failed = False
+        self.condition = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        next_grab = time.perf_counter()
+        while not self._stop.is_set():
+            try:
+                grabbed = self.source.grab(self.region)
+                slot = self.count % len(self.buffers)
+                with self.condition:
+                    np.copyto(self.buffers[slot], grabbed.pixels)
+                    self.frames[slot] = FrameSnapshot(self.region[0], self.region[1], self.buffers[slot],
+                                                      grabbed.timestamp, number=self.count)
+                    self.count += 1
+                    self.condition.notify_all()
+                self.errors = 0
+            except Exception:
+                self.errors += 1
+                if self.metrics:
+                    self.metrics.counters["grabber_errors"] += 1
+                if self.errors >= self.max_errors:
+                    # Stop serving frames so capture_region goes back to grabbing directly.
+                    with self.condition:
+                        self.failed = True
+                        self.condition.notify_all()
+                    return
+            next_grab = max(next_grab + self.interval, time.perf_counter())
+            self._stop.wait(next_grab - time.perf_counter())
+
+    def frame_after(self, timestamp, region=None, timeout=0.25):
+        """A copy of region from the newest frame whose grab started at or after timestamp, waiting for one
+        if needed."""
+        region = region or self.region
+        with self.condition:
+            self.condition.wait_for(
+                lambda: self.failed or (self.count and
+                                        self.frames[(self.count - 1) % len(self.buffers)].timestamp >= timestamp),
+                timeout=timeout)
+            frame = self.frames[(self.count - 1) % len(self.buffers)] if self.count else None
+            if frame is None or frame.timestamp < timestamp:
+                return None
+            return FrameSnapshot(region[0], region[1], frame.view(region).copy(), frame.timestamp,
+                                 number=frame.number)
+
+    def covers(self, region):
+        return region_contains(self.region, region)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+
+
+class CompiledTemplate:
+    """Read-only matcher inputs derived once from a template image."""
+
+    __slots__ = ("name", "width", "height", "center", "use_mask", "bgr", "bgra", "mask", "gray", "edges",
+                 "half", "half_mask", "quarter", "quarter_mask")
+
+    CANNY_THRESHOLDS = (50, 150)
+
+    ARRAY_FIELDS = ("bgr", "bgra", "mask", "gray", "edges", "half", "half_mask", "quarter", "quarter_mask")
+
+    def __init__(self, name, image):
+        if image.ndim == 2:
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGRA)
+        elif image.shape[2] == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2BGRA)
+        height, width = image.shape[:2]
+        alpha = image[:, :, 3]
+        use_mask = bool((alpha < 255).any())
+        bgr = np.ascontiguousarray(image[:, :, :3])
+        bgra = cv2.cvtColor(bgr, cv2.COLOR_BGR2BGRA)
+        mask = np.ascontiguousarray(alpha) if use_mask else None
+
+        gray = cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY)
+        fields = {
+            "name": name,
+            "width": width,
+            "height": height,
+            "center": (width // 2, height // 2),
+            "use_mask": use_mask,
+            "bgr": bgr,
+            "bgra": bgra,
+            "mask": mask,
+            "gray": gray,
+            "edges": cv2.Canny(gray, *self.CANNY_THRESHOLDS),
+        }
+        for level, scale in (("half", 2), ("quarter", 4)):
+            size = (max(1, width // scale), max(1, height // scale))
+            fields[level] = cv2.resize(bgra, size, interpolation=cv2.INTER_AREA)
+            fields[level + "_mask"] = (cv2.resize(mask, size, interpolation=cv2.INTER_NEAREST)
+                                       if use_mask else None)
+        self._assign(fields)
+
+    @classmethod
+    def from_fields(cls, fields):
+        """Rebuilds a template from already derived fields, e.g. arrays mapped from a bundle."""
+        template = cls.__new__(cls)
+        template._assign(fields)
+        return template
+
+    def _assign(self, fields):
+        for key, value in fields.items():
+            if isinstance(value, np.ndarray) and value.flags.writeable:
+                value.flags.writeable = False
+            object.__setattr__(self, key, value)
+
+    def __setattr__(self, key, value):
+        raise AttributeError(f"CompiledTemplate '{self.name}' is read-only")
+
+
+class TemplateStore:
+    """Compiled templates by image_files key. A loader, if given, runs on first use instead of at construction."""
+
+    def __init__(self, loader=None):
+        self._templates = {}
+        self._loader = loader
+        self._lock = threading.RLock()
+
+    def load(self):
+        if self._loader is not None:
+            with self._lock:
+                if self._loader is not None:
+                    loader, self._loader = self._loader, None
+                    try:
+                        loader()
+                    except Exception:
+                        self._loader = loader
+                        raise
+        return self._templates
+
+    def add(self, name, image):
+        self._templates[name] = CompiledTemplate(name, image)
+
+    def save_bundle(self, path, sources):
+        """Writes every template's derived arrays to path.npy, with an index and the source checksums in path.json."""
+        index, chunks, offset = {}, [], 0
+        for name, template in self.load().items():
+            arrays = {}
+            for field in CompiledTemplate.ARRAY_FIELDS:
+                value = getattr(template, field)
+                if value is None:
+                    continue
+                arrays[field] = {"offset": offset, "shape": list(value.shape)}
+                chunks.append(np.ascontiguousarray(value).ravel())
+                offset += value.size
+            index[name] = {"width": template.width, "height": template.height, "center": list(template.center),
+                           "use_mask": template.use_mask, "arrays": arrays}
+        np.save(path + ".npy", np.concatenate(chunks) if chunks else np.zeros(0, np.uint8))
+        with open(path + ".json", "w") as f:
+            json.dump({"sources": sources, "templates": index}, f, indent=1)
+
+    def load_bundle(self, path, sources):
+        """Maps a bundle written by save_bundle. Returns False if it is missing, unreadable or its sources changed."""
+        try:
+            with open(path + ".json") as f:
+                bundle = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if bundle.get("sources") != sources:
+            return False
+        templates = {}
+        try:
+            data = np.load(path + ".npy", mmap_mode="r")
+            for name, entry in bundle["templates"].items():
+                fields = dict.fromkeys(CompiledTemplate.ARRAY_FIELDS)
+                for field, location in entry["arrays"].items():
+                    size = math.prod(location["shape"])
+                    chunk = data[location["offset"]:location["offset"] + size]
+                    fields[field] = np.asarray(chunk).reshape(location["shape"])
+                fields.update(name=name, width=entry["width"], height=entry["height"], center=tuple(entry["center"]),
+                              use_mask=entry["use_mask"])
+                templates[name] = CompiledTemplate.from_fields(fields)
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+        self._templates.update(templates)
+        return True
+
+    def get(self, name):
+        return self.load().get(name)
+
+    def __getitem__(self, name):
+        return self.load()[name]
+
+    def __contains__(self, name):
+        return name in self.load()
+
+    def __iter__(self):
+        return iter(self.load())
+
+    def __len__(self):
+        return len(self.load())
+
+
+class PixelSignature:
+    """Remembers thumbnails of a region seen with and without a template, and answers from the nearest one."""
+
+    SIZE = (16, 8)
+
+    def __init__(self, tolerance=4.0, capacity=8, verify_every=16, verify_interval=2.0):
+        self.tolerance = tolerance
+        self.seen = {True: collections.deque(maxlen=capacity), False: collections.deque(maxlen=capacity)}
+        self.verify_every = verify_every
+        self.verify_interval = verify_interval
+        self.hits_since_check = 0
+        self.last_check = time.perf_counter()
+
+    def thumbnail(self, pixels):
+        return cv2.resize(pixels, self.SIZE, interpolation=cv2.INTER_AREA)[:, :, :3].astype(np.int16)
+
+    def distance(self, thumbnail, answer):
+        return min((np.abs(thumbnail - seen).mean() for seen in self.seen[answer]), default=math.inf)
+
+    def classify(self, thumbnail):
+        shown, hidden = self.distance(thumbnail, True), self.distance(thumbnail, False)
+        nearest, other = min(shown, hidden), max(shown, hidden)
+        if nearest > self.tolerance or other <= 2 * self.tolerance:
+            return None
+        return bool(shown < hidden)
+
+    def due(self):
+        """Whether the next answer should come from a full match even if classify has one."""
+        return self.hits_since_check >= self.verify_every or \
+            time.perf_counter() - self.last_check >= self.verify_interval
+
+    def learn(self, thumbnail, answer):
+        """Records a full match's answer, dropping thumbnails near it that were learned with the other answer."""
+        self.hits_since_check = 0
+        self.last_check = time.perf_counter()
+        wrong = self.seen[not answer]
+        kept = [seen for seen in wrong if np.abs(thumbnail - seen).mean() > self.tolerance]
+        if len(kept) < len(wrong):
+            wrong.clear()
+            wrong.extend(kept)
+        if self.distance(thumbnail, answer) > self.tolerance / 2:
+            self.seen[answer].append(thumbnail)
+
+
+class RestockSchedule:
+    """Restock sightings, and the wall-clock schedule phase + k * period they fit, kept in a JSON file."""
+
+    def __init__(self, path=None, capacity=32, min_samples=4, min_period=10.0, lead=1.5):
+        self.path = path
+        self.capacity = capacity
+        self.min_samples = min_samples
+        self.min_period = min_period
+        self.lead = lead
+        self.times = []
+        self.period = self.phase = self.spread = None
+        if path and os.path.exists(path):
+            try:
+                with open(path) as f:
+                    self.times = json.load(f).get("times", [])[-capacity:]
+            except (OSError, ValueError):
+                self.times = []
+            self.estimate()
+
+    def record(self, before, after, max_uncertainty=2.0):
+        """Adds a restock that happened between a sample still out of stock at before and one in stock at after."""
+        if after - before > max_uncertainty:
+            return
+        self.times = (self.times + [(before + after) / 2])[-self.capacity:]
+        self.estimate()
+        if self.path:
+            try:
+                with open(self.path, "w") as f:
+                    json.dump({"times": self.times, "period": self.period, "phase": self.phase}, f, indent=2)
+            except OSError as e:
+                print(f"Failed to save restock schedule: {e}")
+
+    def estimate(self):
+        self.period = self.phase = self.spread = None
+        gaps = [b - a for a, b in zip(self.times, self.times[1:]) if b - a >= self.min_period]
+        if len(gaps) < self.min_samples - 1:
+            return
+        period = min(gaps)
+        for _ in range(3):
+            period = statistics.median(gap / max(1, round(gap / period)) for gap in gaps)
+
+        counts = [round((t - self.times[0]) / period) for t in self.times]
+        mean_count, mean_time = statistics.fmean(counts), statistics.fmean(self.times)
+        variance = sum((k - mean_count) ** 2 for k in counts)
+        if variance == 0:
+            return
+        period = sum((k - mean_count) * (t - mean_time) for k, t in zip(counts, self.times)) / variance
+        start = mean_time - period * mean_count
+        spread = math.sqrt(statistics.fmean((t - start - period * k) ** 2 for k, t in zip(counts, self.times)))
+        if spread <= period / 10:
+            self.period, self.phase, self.spread = period, start % period, spread
+
+    def window_lead(self):
+        return max(self.lead, 3 * self.spread)
+
+    def seconds_until_window(self, now):
+        """Seconds until the watch window around the next predicted restock opens: 0 inside it, None if unknown."""
+        if self.period is None:
+            return None
+        lead = self.window_lead()
+        restock = self.phase + math.ceil((now - lead - self.phase) / self.period) * self.period
+        return max(0.0, restock - lead - now)
+
+
+class RollingHistogram:
+    """Cumulative Prometheus-style buckets plus a window of recent samples for percentiles."""
+
+    BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+    def __init__(self, buckets=BUCKETS, window=512):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+        self.recent = collections.deque(maxlen=window)
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        self.recent.append(value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.bucket_counts[i] += 1
+                break
+
+    def percentile(self, q):
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def summary(self):
+        recent = list(self.recent)
+        return {
+            "count": self.count,
+            "mean": sum(recent) / len(recent) if recent else None,
+            "p50": self.percentile(0.5),
+            "p90": self.percentile(0.9),
+            "p99": self.percentile(0.99),
+        }
+
+
+class MacroMetrics:
+    SCORE_BUCKETS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 1.0)
+
+    def __init__(self):
+        self.histograms = {}
+        self.counters = collections.Counter()
+        self.started = time.perf_counter()
+
+    def histogram(self, name, label, buckets=RollingHistogram.BUCKETS):
+        key = (name, label)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = RollingHistogram(buckets)
+        return histogram
+
+    def observe(self, name, label, value):
+        self.histogram(name, label).observe(value)
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("phase_seconds", name, time.perf_counter() - started)
+
+    def observe_match(self, template_name, seconds, score):
+        self.observe("match_seconds", template_name, seconds)
+        if math.isfinite(score):
+            self.histogram("match_score", template_name, self.SCORE_BUCKETS).observe(score)
+
+    def packs_per_hour(self):
+        elapsed = time.perf_counter() - self.started
+        return 3600 * self.counters["packs_bought"] / elapsed if elapsed > 0 else 0.0
+
+    def summary_text(self):
+        cycle = self.histograms.get(("cycle_seconds", "all"))
+        cycle_mean = cycle.summary()["mean"] if cycle else None
+        cycle_text = f"{cycle_mean:.1f}s" if cycle_mean is not None else "--"
+        return f"Cycle {cycle_text} · {self.packs_per_hour():.0f} packs/h"
+
+    def snapshot(self):
+        return {
+            "time": time.time(),
+            "uptime": time.perf_counter() - self.started,
+            "packs_per_hour": self.packs_per_hour(),
+            "counters": dict(self.counters),
+            "histograms": {f"{name}{{{label}}}": histogram.summary()
+                           for (name, label), histogram in self.histograms.items()},
+        }
+
+    def prometheus_text(self):
+        lines = []
+        label_names = {"phase_seconds": "phase", "match_seconds": "template", "match_score": "template",
+                       "capture_seconds": "region", "cycle_seconds": "kind"}
+        for name in sorted({name for name, _ in self.histograms}):
+            lines.append(f"# TYPE abr_{name} histogram")
+            label_name = label_names.get(name, "label")
+            for (metric, label), histogram in sorted(self.histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.bucket_counts):
+                    cumulative += count
+                    lines.append(f'abr_{name}_bucket{{{label_name}="{label}",le="{bound}"}} {cumulative}')
+                lines.append(f'abr_{name}_bucket{{{label_name}="{label}",le="+Inf"}} {histogram.count}')
+                lines.append(f'abr_{name}_sum{{{label_name}="{label}"}} {histogram.total}')
+                lines.append(f'abr_{name}_count{{{label_name}="{label}"}} {histogram.count}')
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"# TYPE abr_{name}_total counter")
+            lines.append(f"abr_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, "metrics.jsonl"), "a") as f:
+            f.write(json.dumps(self.snapshot()) + "\n")
+        prom_path = os.path.join(directory, "metrics.prom")
+        with open(prom_path + ".tmp", "w") as f:
+            f.write(self.prometheus_text())
+        os.replace(prom_path + ".tmp", prom_path)
+
+
+class UiObservation:
+    __slots__ = ("state", "confidence", "scores", "locations", "timestamp")
+
+    def __init__(self, state, confidence, scores, locations, timestamp):
+        self.state = state
+        self.confidence = confidence
+        self.scores = scores
+        self.locations = locations
+        self.timestamp = timestamp
 
-    def focusOutEvent(self, event):
-        self.is_capturing = False
-        super().focusOutEvent(event)
 
 class RobloxMacroBackend:
+    TEMPLATE_BUNDLE = "templates"
+    MATCH_CONFIDENCE = 0.7
+
     def __init__(self):
         if getattr(sys, 'frozen', False):
             self.script_dir = sys._MEIPASS
+            self.data_dir = os.path.dirname(sys.executable)
         else:
             self.script_dir = os.path.dirname(os.path.abspath(__file__))        
+            self.data_dir = self.script_dir
         self.image_dir = os.path.join(self.script_dir, "images")
+        self.template_bundle = os.path.join(self.image_dir, self.TEMPLATE_BUNDLE)
         self.image_files = {
             "SummonScreen": "SummonScreen.png",
             "NoStock": "NoStock.png",
             "XButton": "XButton.png",
             "SummonButton": "SummonButton.png",
             "SellButton": "SellButton.png",
+            "SellInv": "SellInv.png",
             "DragonRealmPack": "DragonRealmPack.png",
             "SorcererRealmPack": "SorcererRealmPack.png",
             "PirateRealmPack": "PirateRealmPack.png",
@@ -144,12 +858,37 @@ class RobloxMacroBackend:
             "HunterRealmPack": "HunterRealmPack.png",
             "ShinobiRealmPack": "ShinobiRealmPack.png",
         }
-        self.running = False
-        self.sct = None
+        self.stop_event = threading.Event()
+        self.stop_event.set()
+        self.capture = MssCapture()
+        self.input = DirectInput()
+        self.record_dir = None
+        self.metrics = MacroMetrics()
+        self.metrics_dir = None
+        self.log_file = os.path.join(self.data_dir, "logs", "macro.log")
+        self.cycle_started = None
+        self.frame = None
+        self.grabber = None
+        self.capture_fps = 0
+        self.engine = "threaded"
+        self.fast_cursor = False
+        self.instances = None
+        self.travel = None
+        self.last_input_time = 0.0
         self.initial_search = True
         self.LastPackClicked = 0
-        self.image_templates = {}
-        self.load_image_templates()
+        self.scroll_offset = 0.0
+        self.pixels_per_notch = None
+        self.pending_scroll = None
+        self.scroll_blocked = None
+        self.pack_content_y = {}
+        self.pack_column_x = None
+        self.pack_cache = {}
+        self.templates = TemplateStore(loader=self.load_image_templates)
+        self.signatures = {}
+        self.match_memo = collections.OrderedDict()
+        self.match_memo_lock = threading.Lock()
+        self.match_memo_size = 256
         self.regions = {
             "PackFrame": (168, 242, 472, 654),
             "PurchaseLocation": (821, 800, 220, 48),
@@ -158,74 +897,210 @@ class RobloxMacroBackend:
             "SummonButton": (360, 79, 537, 110),
             "SellButton": (972, 78, 537, 110),
             "SellInvClick": (1031, 517),
+            "SellInv": (971, 487, 120, 60),
         }
         self.DefaultLocation = (799, 824)
-
-    def load_image_templates(self):
+        self.base_regions = dict(self.regions)
+        self.base_default_location = self.DefaultLocation
+        self.window = (0, 0, 1920, 1080)
+        self.default_pixels_per_notch = 40
+        self.max_scroll_notches = 15
+        self.match_modes = {}
+        self.match_calibration = {}
+        self.matchers = {
+            "exhaustive": self.match_exhaustive,
+            "pyramid": self.match_pyramid,
+            "gray": self.match_gray,
+            "sqdiff": self.match_sqdiff,
+            "edge": self.match_edge,
+        }
+        self.restock_watch_hz = 25
+        self.restock_idle_hz = 1.0
+        self.restock_window_hz = 60
+        self.restock_schedule = RestockSchedule(os.path.join(self.data_dir, "restock.json"))
+        self.purchase_mode = "sequential"
+        self.click_rate = 12.0
+        self.max_overshoot = 2
+        self.purchase_latency = 0.15
+        self.change_threshold = 2.0
+        self.frame_region = self.bounding_region(self.regions.values())
+        self.selected_packs = []
+        self.phase = "purchase"
+        self.cycle = 0
+        self.attempts = 0
+        self.transitions = self.build_transitions()
+
+    @property
+    def running(self):
+        return not self.stop_event.is_set()
+
+    @running.setter
+    def running(self, value):
+        if value:
+            self.stop_event.clear()
+        else:
+            self.stop_event.set()
+
+    def bounding_region(self, regions):
+        boxes = [r for r in regions if len(r) == 4]
+        left = min(r[0] for r in boxes)
+        top = min(r[1] for r in boxes)
+        right = max(r[0] + r[2] for r in boxes)
+        bottom = max(r[1] + r[3] for r in boxes)
+        return (left, top, right - left, bottom - top)
+
+    def mark_input(self):
+        self.last_input_time = time.perf_counter()
+        self.frame = None
+
+    def click(self):
+        self.input.click()
+        self.mark_input()
+
+    def capture_region(self, region):
+        started = time.perf_counter()
+        grabber = self.grabber
+        if grabber and grabber.failed:
+            self.grabber = None
+            self.metrics.counters["grabber_stopped"] += 1
+            grabber.close()
+        elif grabber and grabber.covers(region):
+            # One interval for the next grab to start and one for it to finish; past that, grabbing here is faster.
+            frame = grabber.frame_after(self.last_input_time, region, timeout=2 * grabber.interval)
+            if frame is not None:
+                self.metrics.observe("frame_age_seconds", "grabber", started - frame.timestamp)
+                return frame
+        frame = self.capture.grab(region)
+        self.metrics.observe("capture_seconds", f"{region[2]}x{region[3]}", time.perf_counter() - started)
+        return frame
+
+    def capture_frame(self):
+        self.frame = self.capture_region(self.frame_region)
+        return self.frame
+
+    def region_view(self, region):
+        frame = self.frame
+        if frame is None or frame.timestamp < self.last_input_time or not frame.contains(region):
+            frame = self.capture_region(region)
+        return frame.view(region)
+
+    def template_sources(self):
+        sources = {}
         for key, filename in self.image_files.items():
             image_path = os.path.join(self.image_dir, filename)
             if os.path.exists(image_path):
-                self.image_templates[key] = cv2.imread(image_path, cv2.IMREAD_UNCHANGED)
+                with open(image_path, "rb") as f:
+                    sources[key] = zlib.crc32(f.read())
+        return sources
 
-    def human_like_movement(self, start_x, start_y, end_x, end_y):
+    def load_image_templates(self, scale=1.0, use_bundle=True):
+        if use_bundle and scale == 1.0 and self.templates.load_bundle(self.template_bundle, self.template_sources()):
+            return
+        for key, filename in self.image_files.items():
+            image_path = os.path.join(self.image_dir, filename)
+            if os.path.exists(image_path):
+                image = cv2.imread(image_path, cv2.IMREAD_UNCHANGED)
+                if scale != 1.0:
+                    size = (max(1, round(image.shape[1] * scale)), max(1, round(image.shape[0] * scale)))
+                    image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+                self.templates.add(key, image)
+
+    def set_window(self, left, top, width=1920, height=1080):
+        """Points the backend at a game client whose area starts at (left, top), scaling the 1920x1080 layout to fit."""
+        scale_x, scale_y = width / 1920, height / 1080
+
+        def place(value):
+            if len(value) == 2:
+                return (left + round(value[0] * scale_x), top + round(value[1] * scale_y))
+            return (left + round(value[0] * scale_x), top + round(value[1] * scale_y),
+                    round(value[2] * scale_x), round(value[3] * scale_y))
+
+        if (width, height) != self.window[2:]:
+            self.templates = TemplateStore()
+            self.load_image_templates(min(scale_x, scale_y))
+        self.window = (left, top, width, height)
+        self.regions = {name: place(value) for name, value in self.base_regions.items()}
+        self.DefaultLocation = place(self.base_default_location)
+        self.frame_region = self.bounding_region(self.regions.values())
+        self.scroll_offset, self.pixels_per_notch = 0.0, None
+        self.pack_content_y, self.pack_cache, self.signatures = {}, {}, {}
+        self.match_memo.clear()
+
+    def human_like_movement(self, start_x, start_y, end_x, end_y, static=False):
+        fast = static and self.fast_cursor
+        points, step_duration = self.cursor_path(start_x, start_y, end_x, end_y, fast=fast)
+        with self.input.turn():
+            for delay, point in self.paced_path(points, step_duration, "fast" if fast else "human"):
+                if not self.running:
+                    break
+                if delay > 0:
+                    time.sleep(delay)
+                self.input.move_to(*point)
+        self.mark_input()
+
+    def paced_path(self, points, step_duration, label):
+        """Yields (delay, point) so point i goes out at start + i * step_duration, skipping points already overdue."""
+        started = time.perf_counter()
+        last = len(points) - 1
+        i = 0
+        yield 0.0, points[0]
+        while i < last:
+            due = int((time.perf_counter() - started) / step_duration) + 1
+            i = min(last, max(i + 1, due))
+            yield started + i * step_duration - time.perf_counter(), points[i]
+        self.metrics.observe("cursor_overrun_seconds", label,
+                             max(0.0, time.perf_counter() - started - last * step_duration))
+
+    def cursor_path(self, start_x, start_y, end_x, end_y, fast=False):
+        """Points along an eased, randomised Bezier curve ending exactly at the target, and the time per step."""
         distance = math.sqrt((end_x - start_x) ** 2 + (end_y - start_y) ** 2)
-        total_duration = max(0.1, min(0.4, distance / 2000))
-        steps = max(12, int(distance / 50))
-        step_duration = total_duration / steps
-        p0 = np.array([start_x, start_y])
-        p3 = np.array([end_x, end_y])
-        control_x_variance = max(10, int(distance * 0.15))
-        control_y_variance = max(10, int(distance * 0.15))
-        p1 = (p0 + (p3 - p0) * 0.3+ np.array(
-                [
-                    random.randint(-control_x_variance, control_x_variance),
-                    random.randint(-control_y_variance, control_y_variance),
-                ]
-            )
-        )
-        p2 = (p3 - (p3 - p0) * 0.3 + np.array(
-                [
-                    random.randint(-control_x_variance, control_x_variance),
-                    random.randint(-control_y_variance, control_y_variance),
-                ]
-            )
-        )
-        for i in range(steps + 1):
-            if not self.running:
-                break
-            t = i / steps
-            eased_t = 1 - (1 - t) ** 2
-            point = ((1 - eased_t) ** 3 * p0
-                + 3 * (1 - eased_t) ** 2 * eased_t * p1
-                + 3 * (1 - eased_t) * eased_t**2 * p2
-                + eased_t**3 * p3
-            )
-            pydirectinput.moveTo(int(point[0]), int(point[1]), duration=step_duration)
-
-        if self.running:
-            pydirectinput.moveTo(end_x, end_y, duration=step_duration)
+        if fast:
+            total_duration, steps = min(0.05, distance / 8000 + 0.01), 4
+        else:
+            total_duration, steps = max(0.1, min(0.4, distance / 2000)), max(12, int(distance / 50))
+        p0 = np.array([start_x, start_y], dtype=np.float64)
+        p3 = np.array([end_x, end_y], dtype=np.float64)
+        variance = max(10, int(distance * 0.15))
+        p1 = p0 + (p3 - p0) * 0.3 + np.array([random.randint(-variance, variance) for _ in range(2)])
+        p2 = p3 - (p3 - p0) * 0.3 + np.array([random.randint(-variance, variance) for _ in range(2)])
+
+        eased = 1 - (1 - np.linspace(0.0, 1.0, steps + 1)) ** 2
+        basis = np.stack([(1 - eased) ** 3, 3 * (1 - eased) ** 2 * eased, 3 * (1 - eased) * eased ** 2, eased ** 3],
+                         axis=1)
+        points = (basis @ np.stack([p0, p1, p2, p3])).astype(int)
+        points[-1] = (end_x, end_y)
+        return points.tolist(), total_duration / steps
+
+    def stop_travel(self, target=None):
+        if self.travel:
+            self.travel.stop(target)
 
     def human_like_key_press(self, key):
-        pydirectinput.keyDown(key)
-        time.sleep(random.uniform(0.06, 0.11))
-        pydirectinput.keyUp(key)
+        with self.input.turn():
+            self.input.key_down(key)
+            time.sleep(random.uniform(0.06, 0.11))
+            self.input.key_up(key)
+        self.mark_input()
 
     def move_cursor_to_default(self):
-        pydirectinput.moveTo(self.DefaultLocation[0], self.DefaultLocation[1])
+        self.input.move_to(self.DefaultLocation[0], self.DefaultLocation[1])
+        self.mark_input()
         self.responsive_sleep(0.1, None)
 
     def scroll_mouse_wheel(self, x, y, direction="down", clicks=3):
-        current_pos = pydirectinput.position()
-        self.human_like_movement(current_pos[0], current_pos[1], x, y)
+        self.stop_travel()
+        current_pos = self.input.position()
+        self.human_like_movement(current_pos[0], current_pos[1], x, y, static=True)
+        sent = 0
         for _ in range(clicks):
             if not self.running:
                 break
 
-            if direction == "down":
-                win32api.mouse_event(win32con.MOUSEEVENTF_WHEEL, x, y, -120, 0)
-            else:
-                win32api.mouse_event(win32con.MOUSEEVENTF_WHEEL, x, y, 120, 0)
+            self.input.scroll(x, y, -1 if direction == "down" else 1)
+            self.mark_input()
+            sent += 1
             self.responsive_sleep(0.1, None)
+        return sent
 
     def scroll_in_pack_frame(self, direction="down", clicks=3):
         pack_frame_x = (
@@ -234,154 +1109,552 @@ class RobloxMacroBackend:
         pack_frame_y = (
             self.regions["PackFrame"][1] + self.regions["PackFrame"][3] // 2
         )
-        self.scroll_mouse_wheel(pack_frame_x, pack_frame_y, direction, clicks)
-        self.responsive_sleep(0.5, None)
+        with self.metrics.phase("scroll"):
+            sent = self.scroll_mouse_wheel(pack_frame_x, pack_frame_y, direction, clicks)
+            notches = sent if direction == "down" else -sent
+            self.pending_scroll = (self.scroll_offset, notches)
+            self.scroll_offset += notches * (self.pixels_per_notch or self.default_pixels_per_notch)
+            self.wait_for_region_stable(self.regions["PackFrame"], timeout=1.5)
+
+    def find_image_in_region(self, signals, template, region, confidence=0.7):
+        if template is None:
+            if signals: signals.log_updated.emit("Template not in cache!", "error")
+            return None
 
-    def find_image_in_region(self, signals, image_filename, region, confidence=0.7):
         try:
-            image_key = os.path.splitext(image_filename)[0]
-            template = self.image_templates.get(image_key)
-
-            if template is None:
-                if signals: signals.log_updated.emit(f"Template '{image_key}' not in cache!", "error")
-                return None
-
-            monitor_region = {"top": region[1], "left": region[0], "width": region[2], "height": region[3]}
-            sct_img = self.sct.grab(monitor_region)
-            screenshot_cv = cv2.cvtColor(np.array(sct_img), cv2.COLOR_BGRA2BGR)
-            
-            use_mask = len(template.shape) > 2 and template.shape[2] == 4
-            template_bgr = template[:,:,:3] if use_mask else template
-            mask = template[:,:,3] if use_mask else None
-            
-            result = cv2.matchTemplate(screenshot_cv, template_bgr, cv2.TM_CCOEFF_NORMED, mask=mask)
-            _, max_val, _, max_loc = cv2.minMaxLoc(result)
+            screenshot = self.region_view(region)
+            max_val, max_loc = self.match_in_view(template, screenshot)
 
             if max_val >= confidence:
-                h, w = template.shape[:2]
-                return (region[0] + max_loc[0] + w // 2, region[1] + max_loc[1] + h // 2)
+                return (region[0] + max_loc[0] + template.center[0],
+                        region[1] + max_loc[1] + template.center[1])
 
         except Exception as e:
             if signals:
-                signals.log_updated.emit(f"💥 Image search error for {image_filename}: {e}", "error")
+                signals.log_updated.emit(f"💥 Image search error for {template.name}: {e}", "error")
         return None
 
+    def region_shows(self, signals, key, region_name, confidence=0.7):
+        """Whether a template is in a region, answered from learned pixel signatures unless they are ambiguous."""
+        template = self.templates.get(key)
+        if template is None:
+            if signals: signals.log_updated.emit("Template not in cache!", "error")
+            return False
+        signature = self.signatures.get((key, region_name))
+        if signature is None:
+            signature = self.signatures[(key, region_name)] = PixelSignature()
+
+        try:
+            screenshot = self.region_view(self.regions[region_name])
+            thumbnail = signature.thumbnail(screenshot)
+            answer = signature.classify(thumbnail)
+            if answer is not None and not signature.due():
+                signature.hits_since_check += 1
+                self.metrics.counters["signature_hits"] += 1
+                return answer
+            self.metrics.counters["signature_misses" if answer is None else "signature_checks"] += 1
+            max_val, _ = self.match_in_view(template, screenshot)
+            matched = max_val >= confidence
+            if answer is not None and answer != matched:
+                self.metrics.counters["signature_corrections"] += 1
+            signature.learn(thumbnail, matched)
+            return matched
+        except Exception as e:
+            if signals:
+                signals.log_updated.emit(f"💥 Image search error for {key}: {e}", "error")
+        return False
+
+    def content_digest(self, screenshot):
+        return screenshot.shape, zlib.crc32(np.ascontiguousarray(screenshot))
+
+    def match_in_view(self, template, screenshot, digest=None):
+        """Matches template in screenshot, reusing the last result for identical pixels from a small LRU."""
+        mode = self.match_modes.get(template.name)
+        key = (template.name, mode, digest or self.content_digest(screenshot))
+        with self.match_memo_lock:
+            cached = self.match_memo.get(key)
+            if cached is not None:
+                self.match_memo.move_to_end(key)
+                self.metrics.counters["match_memo_hits"] += 1
+                return cached
+        self.metrics.counters["match_memo_misses"] += 1
+
+        started = time.perf_counter()
+        max_val, max_loc = self.matchers.get(mode, self.match_exhaustive)(template, screenshot)
+        self.metrics.observe_match(template.name, time.perf_counter() - started, max_val)
+        with self.match_memo_lock:
+            self.match_memo[key] = (max_val, max_loc)
+            if len(self.match_memo) > self.match_memo_size:
+                self.match_memo.popitem(last=False)
+        return max_val, max_loc
+
+    def set_match_modes(self, modes, calibration):
+        """Adopts the per-template matchers that calibration supports and returns the rejected ones.
+
+        calibration maps template -> mode -> the highest score a non-match got on the calibration corpus
+        (benchmarks/calibrate.py). A mode is rejected if that score reaches MATCH_CONFIDENCE, or if it is
+        sqdiff, whose scores aren't on the confidence scale, and was never calibrated.
+        """
+        self.match_calibration = {key: dict(misses) for key, misses in calibration.items()}
+        rejected = {}
+        for key, mode in modes.items():
+            worst_miss = calibration.get(key, {}).get(mode)
+            if mode not in self.matchers or (worst_miss is None and mode == "sqdiff") \
+                    or (worst_miss is not None and worst_miss >= self.MATCH_CONFIDENCE):
+                rejected[key] = mode
+                self.match_modes.pop(key, None)
+            else:
+                self.match_modes[key] = mode
+        return rejected
+
+    def match_exhaustive(self, template, screenshot):
+        result = cv2.matchTemplate(screenshot, template.bgra, cv2.TM_CCOEFF_NORMED, mask=template.mask)
+        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+        return max_val, max_loc
+
+    def match_gray(self, template, screenshot):
+        gray = cv2.cvtColor(screenshot, cv2.COLOR_BGRA2GRAY)
+        result = cv2.matchTemplate(gray, template.gray, cv2.TM_CCOEFF_NORMED, mask=template.mask)
+        _, max_val, _, max_loc = cv2.minMaxLoc(np.nan_to_num(result, nan=-1.0, posinf=-1.0, neginf=-1.0))
+        return max_val, max_loc
+
+    def match_sqdiff(self, template, screenshot):
+        """Unmasked squared difference, reported as 1 - TM_SQDIFF_NORMED so higher is better. Opaque templates only.
+
+        Not on the TM_CCOEFF_NORMED scale: non-matches can score well above 0.7, so set_match_modes only
+        accepts it for templates calibrate.py has shown it separates.
+        """
+        if template.use_mask:
+            return self.match_exhaustive(template, screenshot)
+        result = cv2.matchTemplate(screenshot, template.bgra, cv2.TM_SQDIFF_NORMED)
+        min_val, _, min_loc, _ = cv2.minMaxLoc(result)
+        return 1.0 - min_val, min_loc
+
+    def match_edge(self, template, screenshot):
+        edges = cv2.Canny(cv2.cvtColor(screenshot, cv2.COLOR_BGRA2GRAY), *CompiledTemplate.CANNY_THRESHOLDS)
+        result = cv2.matchTemplate(edges, template.edges, cv2.TM_CCOEFF_NORMED, mask=template.mask)
+        _, max_val, _, max_loc = cv2.minMaxLoc(np.nan_to_num(result, nan=-1.0, posinf=-1.0, neginf=-1.0))
+        return max_val, max_loc
+
+    def match_pyramid(self, template, screenshot, candidates=3):
+        """Finds peaks on a quarter-scale match, then re-scores each at full resolution in a small window."""
+        scale, small_template, small_mask = 4, template.quarter, template.quarter_mask
+        if min(small_template.shape[:2]) < 6:
+            scale, small_template, small_mask = 2, template.half, template.half_mask
+
+        height, width = screenshot.shape[:2]
+        small_size = (width // scale, height // scale)
+        if small_size[0] < small_template.shape[1] or small_size[1] < small_template.shape[0]:
+            return self.match_exhaustive(template, screenshot)
+
+        small = cv2.resize(screenshot, small_size, interpolation=cv2.INTER_AREA)
+        coarse = cv2.matchTemplate(small, small_template, cv2.TM_CCOEFF_NORMED, mask=small_mask)
+        coarse = np.nan_to_num(coarse, nan=-1.0, posinf=-1.0, neginf=-1.0)
+
+        margin = 2 * scale
+        radius = max(small_template.shape[:2]) // 2
+        best_val, best_loc = -1.0, (0, 0)
+        for _ in range(candidates):
+            _, peak_val, _, (peak_x, peak_y) = cv2.minMaxLoc(coarse)
+            if peak_val <= -1.0:
+                break
+            x0 = max(0, min(peak_x * scale - margin, width - template.width))
+            y0 = max(0, min(peak_y * scale - margin, height - template.height))
+            x1 = min(width, peak_x * scale + template.width + margin)
+            y1 = min(height, peak_y * scale + template.height + margin)
+            max_val, max_loc = self.match_exhaustive(template, screenshot[y0:y1, x0:x1])
+            if max_val > best_val:
+                best_val, best_loc = max_val, (x0 + max_loc[0], y0 + max_loc[1])
+            coarse[max(0, peak_y - radius):peak_y + radius + 1, max(0, peak_x - radius):peak_x + radius + 1] = -1.0
+        return best_val, best_loc
+
+    def locate_all_packs(self, signals, confidence=0.7):
+        region = self.regions["PackFrame"]
+        found = {}
+        with self.metrics.phase("search"):
+            try:
+                screenshot = self.region_view(region)
+                digest = self.content_digest(screenshot)
+                for pack_name in PACK_FULL_NAMES.values():
+                    template = self.templates.get(pack_name.replace(" ", ""))
+                    if template is None:
+                        continue
+                    max_val, max_loc = self.match_in_view(template, screenshot, digest)
+                    if max_val >= confidence:
+                        location = (region[0] + max_loc[0] + template.center[0],
+                                    region[1] + max_loc[1] + template.center[1])
+                        found[pack_name] = (location, max_val)
+            except Exception as e:
+                if signals:
+                    signals.log_updated.emit(f"💥 Pack search error: {e}", "error")
+        return found
+
+    def verify_pack_at(self, template, location, margin=4):
+        window = (location[0] - template.center[0] - margin, location[1] - template.center[1] - margin,
+                  template.width + 2 * margin, template.height + 2 * margin)
+        max_val, max_loc = self.match_in_view(template, self.region_view(window))
+        return max_val, (window[0] + max_loc[0] + template.center[0], window[1] + max_loc[1] + template.center[1])
+
+    def locate_visible_packs(self, signals, confidence=0.7, wanted=()):
+        """Re-checks the packs last seen at this scroll offset in place, falling back to a full search."""
+        cached = self.pack_cache.get(round(self.scroll_offset))
+        if cached and any(name not in cached and self.predict_pack_location(name) for name in wanted):
+            self.metrics.counters["pack_cache_misses"] += 1
+            del self.pack_cache[round(self.scroll_offset)]
+            cached = None
+        if cached:
+            verified = {}
+            try:
+                for pack_name, (location, _) in cached.items():
+                    max_val, location = self.verify_pack_at(self.templates[pack_name.replace(" ", "")], location)
+                    if max_val < confidence:
+                        break
+                    verified[pack_name] = (location, max_val)
+            except Exception as e:
+                if signals:
+                    signals.log_updated.emit(f"💥 Pack search error: {e}", "error")
+            if len(verified) == len(cached):
+                self.metrics.counters["pack_cache_hits"] += 1
+                self.remember_pack_positions(verified)
+                return verified
+            self.metrics.counters["pack_cache_misses"] += 1
+            del self.pack_cache[round(self.scroll_offset)]
+
+        found = self.locate_all_packs(signals, confidence)
+        self.remember_pack_positions(found)
+        return found
+
+    def remember_pack_positions(self, visible_packs):
+        """Re-anchors the scroll offset on packs seen before and learns how far one wheel notch moves the list.
+
+        Offsets are in content pixels: a pack at content y sits on screen at content_y - scroll_offset.
+        """
+        anchors = sorted(self.pack_content_y[name] - location[1]
+                         for name, (location, _) in visible_packs.items() if name in self.pack_content_y)
+        pending_scroll, self.pending_scroll = self.pending_scroll, None
+        if anchors:
+            measured = anchors[len(anchors) // 2]
+            if pending_scroll:
+                offset_before, notches = pending_scroll
+                per_notch = abs(measured - offset_before) / abs(notches) if notches else 0
+                # Hitting the end of the list can only shorten a move, so longer moves win outright
+                # and clearly shorter ones are ignored. A move of 0 (end of list, or the scroll
+                # didn't register) says nothing about the notch size.
+                if per_notch and (self.pixels_per_notch is None or per_notch > 1.25 * self.pixels_per_notch):
+                    self.pixels_per_notch = per_notch
+                elif per_notch and per_notch > 0.8 * self.pixels_per_notch:
+                    self.pixels_per_notch = 0.7 * self.pixels_per_notch + 0.3 * per_notch
+            self.scroll_offset = measured
+        for name, (location, _) in visible_packs.items():
+            self.pack_content_y[name] = location[1] + self.scroll_offset
+        if visible_packs:
+            columns = sorted(location[0] for location, _ in visible_packs.values())
+            self.pack_column_x = columns[len(columns) // 2]
+            self.pack_cache[round(self.scroll_offset)] = visible_packs
+
+    def predict_pack_location(self, pack_name):
+        """Where the pack should be on screen at the current scroll offset, if it should be in PackFrame."""
+        content_y = self.pack_content_y.get(pack_name)
+        if content_y is None or self.pack_column_x is None:
+            return None
+        location = (self.pack_column_x, round(content_y - self.scroll_offset))
+        frame = self.regions["PackFrame"]
+        return location if frame[1] <= location[1] < frame[1] + frame[3] else None
+
+    def estimate_content_y(self, pack_name):
+        if pack_name in self.pack_content_y:
+            return self.pack_content_y[pack_name]
+        pack_order = list(PACK_FULL_NAMES.values())
+        known = sorted((pack_order.index(name), y) for name, y in self.pack_content_y.items())
+        if len(known) < 2:
+            return None
+        spacings = sorted((y2 - y1) / (i2 - i1) for (i1, y1), (i2, y2) in zip(known, known[1:]))
+        spacing = spacings[len(spacings) // 2]
+        index = pack_order.index(pack_name)
+        nearest, y = min(known, key=lambda item: abs(item[0] - index))
+        return y + (index - nearest) * spacing
+
+    def notches_to_pack(self, pack_name):
+        """Fewest wheel notches (positive is down) that bring the pack fully into PackFrame, or None if unknown."""
+        content_y = self.estimate_content_y(pack_name)
+        if content_y is None:
+            return None
+        frame = self.regions["PackFrame"]
+        margin = self.templates[pack_name.replace(" ", "")].height / 2 + 8
+        screen_y = content_y - self.scroll_offset
+        if screen_y < frame[1] + margin:
+            delta = screen_y - frame[1] - margin
+        elif screen_y > frame[1] + frame[3] - margin:
+            delta = screen_y - frame[1] - frame[3] + margin
+        elif pack_name in self.pack_content_y:
+            # It should be on screen but was not found, so the remembered position is stale.
+            del self.pack_content_y[pack_name]
+            return self.notches_to_pack(pack_name)
+        else:
+            return None
+        notches = math.ceil(abs(delta) / (self.pixels_per_notch or self.default_pixels_per_notch))
+        return int(math.copysign(min(notches, self.max_scroll_notches), delta))
+
+    def scroll_toward_pack(self, signals, pack_name):
+        notches = self.notches_to_pack(pack_name)
+        if not notches:
+            pack_order = list(PACK_FULL_NAMES.values())
+            direction = "down" if pack_order.index(pack_name) >= self.LastPackClicked else "up"
+            if self.scroll_blocked == direction:
+                direction = "up" if direction == "down" else "down"
+            notches = 3 if direction == "down" else -3
+        direction = "down" if notches > 0 else "up"
+        signals.log_updated.emit(f"Scrolling {direction} {abs(notches)}...", "action")
+        pack_frame = self.regions["PackFrame"]
+        reference = self.sample_region(pack_frame)
+        self.scroll_in_pack_frame(direction, abs(notches))
+        moved = self.samples_differ(self.sample_region(pack_frame), reference)
+        self.scroll_blocked = None if moved else direction
+        if not moved and self.pending_scroll:
+            self.scroll_offset, self.pending_scroll = self.pending_scroll[0], None
+
+    def click_at(self, location, static=True):
+        self.stop_travel(location)
+        current_pos = self.input.position()
+        with self.input.turn():
+            if abs(current_pos[0] - location[0]) > 2 or abs(current_pos[1] - location[1]) > 2:
+                self.human_like_movement(
+                    current_pos[0], current_pos[1],
+                    location[0], location[1],
+                    static,
+                )
+            self.click()
+
     def search_and_click_pack(self, signals, pack_name):
         pack_image_key = pack_name.replace(" ", "")
-        if pack_image_key not in self.image_files:
-            return False            
-
-        pack_location = self.find_image_in_region(
-            signals,
-            self.image_files[pack_image_key],
-            self.regions["PackFrame"],
-        )
+        if pack_image_key not in self.templates:
+            return False
 
-        if pack_location:
-            current_pos = pydirectinput.position()
-            self.human_like_movement(
-                current_pos[0], current_pos[1],
-                pack_location[0], pack_location[1],
-            )
-            pydirectinput.click()
+        visible_packs = self.locate_visible_packs(signals, wanted=(pack_name,))
+        if pack_name in visible_packs:
+            self.click_at(visible_packs[pack_name][0], static=False)
             return True
         return False
 
+    def buy_pack_at(self, signals, pack_name, location):
+        pack_order = list(PACK_FULL_NAMES.values())
+        purchase_region = self.regions["PurchaseLocation"]
+        reference = self.sample_region(purchase_region)
+        self.click_at(location, static=False)
+        self.initial_search = False
+        self.LastPackClicked = pack_order.index(pack_name)
+        self.wait_for_region_change(purchase_region, reference, timeout=1)
+
+        if self.is_pack_out_of_stock(signals):
+            signals.log_updated.emit(f"{pack_name.replace(' Realm Pack', '')} is out of stock.", "info")
+            return False
+
+        self.purchase_pack(signals, pack_name)
+        signals.log_updated.emit(f"{pack_name.replace(' Realm Pack', '')} fully purchased.", "success")
+        return True
+
     def is_pack_out_of_stock(self, signals):
-        return self.find_image_in_region(
-            signals,
-            self.image_files["NoStock"],
-            self.regions["PurchaseLocation"],
-        ) is not None
+        return self.region_shows(signals, "NoStock", "PurchaseLocation")
 
     def purchase_pack(self, signals, pack_name):
         purchase_x = self.regions["PurchaseLocation"][0] + self.regions["PurchaseLocation"][2] // 2
         purchase_y = self.regions["PurchaseLocation"][1] + self.regions["PurchaseLocation"][3] // 2
         
-        current_pos = pydirectinput.position()
-        self.human_like_movement(current_pos[0], current_pos[1], purchase_x, purchase_y)
+        current_pos = self.input.position()
+        self.human_like_movement(current_pos[0], current_pos[1], purchase_x, purchase_y, static=True)
         
         signals.log_updated.emit(f"Buying {pack_name.replace(' Realm Pack', '')}...", "action")
-        while self.running:
-            if self.is_pack_out_of_stock(signals):
-                break
-            
-            pydirectinput.click()
-            self.responsive_sleep(0.5, signals)
+        with self.metrics.phase("purchase"):
+            if self.purchase_mode == "concurrent":
+                self.purchase_concurrently(signals)
+                return
+            while self.running:
+                if self.is_pack_out_of_stock(signals):
+                    break
+
+                self.click()
+                self.metrics.counters["packs_bought"] += 1
+                if self.wait_until(lambda: self.is_pack_out_of_stock(signals), timeout=0.5):
+                    break
+
+    def purchase_concurrently(self, signals):
+        """Clicks at click_rate while a monitor thread watches for NoStock; wastes at most
+        max_overshoot + click_rate * purchase_latency clicks."""
+        condition = threading.Condition()
+        out_of_stock = threading.Event()
+        click_times = []
+        state = {"allowed": 0, "bought": None}
+
+        def monitor():
+            try:
+                while self.running and not out_of_stock.is_set():
+                    grabbed_at = time.perf_counter()
+                    with condition:
+                        clicks_before = len(click_times)
+                    if self.is_pack_out_of_stock(signals):
+                        with condition:
+                            state["bought"] = bisect.bisect_left(click_times, grabbed_at - self.purchase_latency)
+                        break
+                    with condition:
+                        state["allowed"] = max(state["allowed"], clicks_before + self.max_overshoot)
+                        condition.notify()
+            finally:
+                out_of_stock.set()
+                with condition:
+                    condition.notify()
+
+        watcher = threading.Thread(target=monitor, daemon=True)
+        watcher.start()
+        interval = 1.0 / self.click_rate
+        next_click = time.perf_counter()
+        try:
+            while self.running and not out_of_stock.is_set():
+                with condition:
+                    condition.wait_for(lambda: len(click_times) < state["allowed"] or out_of_stock.is_set(),
+                                       timeout=0.5)
+                    if out_of_stock.is_set() or len(click_times) >= state["allowed"]:
+                        continue
+                    click_times.append(time.perf_counter())
+                self.click()
+                next_click = max(next_click + interval, time.perf_counter())
+                out_of_stock.wait(next_click - time.perf_counter())
+        finally:
+            out_of_stock.set()
+            watcher.join()
+            bought = len(click_times) if state["bought"] is None else state["bought"]
+            self.metrics.counters["packs_bought"] += bought
 
     def is_summon_screen_open(self, signals):
-        return self.find_image_in_region(
-            signals,
-            self.image_files["SummonScreen"],
-            self.regions["SummonScreen"],
-        ) is not None
-
-    def close_shop_with_image(self, signals):
-        x_button_loc = self.find_image_in_region(
-            signals,
-            self.image_files["XButton"],
-            self.regions["XButton"],
-            confidence=0.7,
-        )
+        return self.region_shows(signals, "SummonScreen", "SummonScreen")
 
-        if x_button_loc:
-            signals.log_updated.emit("Closing shop...", "action")
-            current_pos = pydirectinput.position()
-            self.human_like_movement(
-                current_pos[0], current_pos[1],
-                x_button_loc[0], x_button_loc[1],
-            )
-            pydirectinput.click()
-            return True
-        return False
+    def is_sell_menu_open(self, signals):
+        return self.region_shows(signals, "SellInv", "SellInv")
 
-    def logic_open_shop(self, signals):
-        signals.log_updated.emit("Opening Shop...", "action")
-        max_attempts, i = 3, 0
-        while i < max_attempts and self.running:
-            if self.is_summon_screen_open(signals):
-                return True
+    def classify_ui_state(self, signals, confidence=0.7):
+        """Probes one frame snapshot and reports which screen the game is showing."""
+        scores, locations = {}, {}
+        frame = self.capture_frame()
 
-            summon_btn = self.find_image_in_region(
-                signals,
-                self.image_files["SummonButton"],
-                self.regions["SummonButton"],
-            )
+        def probe(key, region_name):
+            template = self.templates.get(key)
+            if template is None:
+                return False
+            region = self.regions[region_name]
+            max_val, max_loc = self.match_in_view(template, frame.view(region))
+            scores[key] = max_val
+            if max_val < confidence:
+                return False
+            locations[key] = (region[0] + max_loc[0] + template.center[0],
+                              region[1] + max_loc[1] + template.center[1])
+            return True
 
-            if summon_btn:
-                self.human_like_movement(
-                    pydirectinput.position()[0], pydirectinput.position()[1],
-                    summon_btn[0], summon_btn[1],
-                )
-                pydirectinput.click()
-                self.responsive_sleep(0.5, signals)
-                self.human_like_key_press("e")
-                self.responsive_sleep(1.5, signals)
+        if probe("SellInv", "SellInv"):
+            probe("SummonButton", "SummonButton")
+            state, basis = "sell_menu", "SellInv"
+        elif probe("SummonScreen", "SummonScreen"):
+            probe("XButton", "XButton")
+            if probe("NoStock", "PurchaseLocation"):
+                state, basis = "out_of_stock", "NoStock"
             else:
-                signals.log_updated.emit(f"Cannot find Summon Button (attempt {i+1})", "error")
-                i += 1
-                self.responsive_sleep(1, signals)
+                state, basis = "summon_shop", "SummonScreen"
+        elif probe("SummonButton", "SummonButton"):
+            state, basis = "world", "SummonButton"
+        else:
+            state, basis = "unknown", None
 
-        return self.is_summon_screen_open(signals)
+        return UiObservation(state, scores.get(basis, 0.0), scores, locations, frame.timestamp)
 
-    def logic_sell_items(self, signals):
+    def build_transitions(self):
+        transitions = {
+            ("sell", "world"): self.step_sell_items,
+            ("sell", "unknown"): self.step_sell_items,
+            ("sell", "sell_menu"): self.step_confirm_sale,
+        }
+        for state in ("world", "sell_menu", "unknown"):
+            transitions[("purchase", state)] = self.step_open_shop
+            transitions[("close", state)] = self.step_finish_close
+            transitions[("restock", state)] = self.step_open_shop
+        for state in ("summon_shop", "out_of_stock"):
+            transitions[("purchase", state)] = self.step_buy_packs
+            transitions[("close", state)] = self.step_close_shop
+            transitions[("sell", state)] = self.step_close_shop
+            transitions[("restock", state)] = self.step_wait_restock
+        return transitions
+
+    def enter_phase(self, signals, phase):
+        self.phase = phase
+        self.attempts = 0
+        if phase == "purchase":
+            now = time.perf_counter()
+            if self.cycle_started is not None:
+                self.metrics.observe("cycle_seconds", "all", now - self.cycle_started)
+                self.metrics.counters["cycles"] += 1
+                if self.metrics_dir:
+                    try:
+                        self.metrics.write(self.metrics_dir)
+                    except OSError as e:
+                        signals.log_updated.emit(f"Failed to write metrics: {e}", "error")
+            self.cycle_started = now
+            self.cycle += 1
+            signals.log_updated.emit(f"Cycle #{self.cycle} - Purchase Phase", "system")
+
+    def click_and_wait_for_teleport(self, location, timeout=0.5):
+        """Clicks a teleport button and waits for the world view to change, or at most timeout."""
+        # PackFrame shows the world while no menu is open, and a hover highlight on the button doesn't reach it.
+        region = self.regions["PackFrame"]
+        reference = self.sample_region(region)
+        self.click_at(location)
+        return self.wait_for_region_change(region, reference, timeout)
+
+    def step_open_shop(self, signals, observation):
+        summon_btn = observation.locations.get("SummonButton")
+        if summon_btn is None:
+            self.attempts += 1
+            signals.log_updated.emit(f"Cannot find Summon Button (attempt {self.attempts})", "error")
+            self.responsive_sleep(1, signals)
+            return self.phase
+
+        signals.log_updated.emit("Opening Shop...", "action")
+        self.click_and_wait_for_teleport(summon_btn)
+        self.human_like_key_press("e")
+        self.wait_until(lambda: self.is_summon_screen_open(signals), timeout=3)
+        return self.phase
+
+    def step_close_shop(self, signals, observation):
+        x_button_loc = observation.locations.get("XButton")
+        if x_button_loc is None:
+            self.attempts += 1
+            if self.attempts >= 5:
+                signals.log_updated.emit("Cannot find the shop's close button.", "error")
+                return "sell" if self.phase == "close" else "restock"
+            self.responsive_sleep(0.5, signals)
+            return self.phase
+
+        signals.log_updated.emit("Closing shop...", "action")
+        self.click_at(x_button_loc)
+        self.wait_until(lambda: not self.is_summon_screen_open(signals), timeout=1.5)
+        return self.phase
+
+    def step_finish_close(self, signals, observation):
+        return "sell"
+
+    def step_sell_items(self, signals, observation):
         signals.log_updated.emit("Selling items...", "action")
         sell_btn = self.find_image_in_region(
-            signals, self.image_files["SellButton"], self.regions["SellButton"]
+            signals, self.templates.get("SellButton"), self.regions["SellButton"]
         )
 
         if not sell_btn:
             signals.log_updated.emit("Cannot find Sell Button.", "error")
-            return False
+            signals.log_updated.emit("Failed to sell items.", "error")
+            return "restock"
 
-        self.human_like_movement(
-            pydirectinput.position()[0], pydirectinput.position()[1],
-            sell_btn[0], sell_btn[1],
-        )
-        pydirectinput.click()
-        self.responsive_sleep(0.5, signals)
+        self.click_and_wait_for_teleport(sell_btn)
         self.human_like_key_press("e")
-        self.responsive_sleep(1.0, signals)
+        self.wait_until(lambda: self.is_sell_menu_open(signals), timeout=1.0)
+        return self.step_confirm_sale(signals, observation)
+
+    def step_confirm_sale(self, signals, observation):
         signals.log_updated.emit("Confirming sale...", "action")
         base_pos = self.regions["SellInvClick"]
 
@@ -389,467 +1662,684 @@ class RobloxMacroBackend:
             if not self.running: break
             jitter_x = base_pos[0] + random.randint(-3, 3)
             jitter_y = base_pos[1] + random.randint(-3, 3)
-            self.human_like_movement(
-                pydirectinput.position()[0], pydirectinput.position()[1],
-                jitter_x, jitter_y,
-            )
-            pydirectinput.click()
+            self.click_at((jitter_x, jitter_y))
             self.responsive_sleep(0.1, signals)
         signals.log_updated.emit("Items sold.", "success")
-        return True
-
-    def wait_for_restock(self, signals):
-        if not self.is_summon_screen_open(signals):
-            if not self.logic_open_shop(signals):
-                signals.log_updated.emit("Failed to open shop for restock check.", "error")
-                self.responsive_sleep(5, signals)
-                return
+        return "restock"
+
+    def step_buy_packs(self, signals, observation):
+        pack_order = list(PACK_FULL_NAMES.values())
+        temp_pack_order = {name: i for i, name in enumerate(pack_order)}
+        packs_to_buy = sorted(self.selected_packs, key=lambda x: temp_pack_order.get(x, 99))
+        start_index = 0
+        if not self.initial_search:
+            for i, pack in enumerate(packs_to_buy):
+                if temp_pack_order.get(pack, 99) >= self.LastPackClicked:
+                    start_index = i
+                    break
+        reordered_packs = packs_to_buy[start_index:] + packs_to_buy[:start_index]
+
+        remaining = list(reordered_packs)
+        scroll_attempts, max_scrolls = 0, 10
+
+        while remaining and scroll_attempts < max_scrolls and self.running:
+            signals.log_updated.emit(f"Searching for {remaining[0].replace(' Realm Pack', '')}...", "action")
+            predicted = self.predict_pack_location(remaining[0])
+            if predicted and self.travel:
+                self.travel.start(*predicted)
+            visible_packs = self.locate_visible_packs(signals, wanted=remaining)
+            in_view = [pack_name for pack_name in remaining if pack_name in visible_packs]
+
+            if not in_view:
+                self.scroll_toward_pack(signals, remaining[0])
+                scroll_attempts += 1
+                continue
+
+            scroll_attempts = 0
+            for pack_name in in_view:
+                if not self.running: break
+                remaining.remove(pack_name)
+                self.buy_pack_at(signals, pack_name, visible_packs[pack_name][0])
+
+        if not self.running:
+            return self.phase
+        for pack_name in remaining:
+            signals.log_updated.emit(f"{pack_name.replace(' Realm Pack', '')} not found.", "error")
+        signals.log_updated.emit("Purchase phase complete.", "success")
+        return "close"
+
+    def step_wait_restock(self, signals, observation):
+        self.select_pack_to_watch(signals)
+        if self.watch_for_restock(signals):
+            signals.log_updated.emit("SHOP RESTOCKED!", "success")
+            return "purchase"
+        return self.phase
 
-        pack_order = list(MainWindow.PACK_COLORS.keys())
+    def select_pack_to_watch(self, signals):
+        pack_order = list(PACK_FULL_NAMES.values())
         last_pack_name = pack_order[self.LastPackClicked]
-        self.search_and_click_pack(signals, last_pack_name)
-        self.responsive_sleep(1, signals)
-
-        while self.running and self.is_pack_out_of_stock(signals):
-            signals.log_updated.emit(f"Watching {last_pack_name}...", "wait")
-            self.responsive_sleep(5, signals)
+        purchase_region = self.regions["PurchaseLocation"]
+        reference = self.sample_region(purchase_region)
+        if self.search_and_click_pack(signals, last_pack_name):
+            self.wait_for_region_change(purchase_region, reference, timeout=1)
+        message = f"Watching {last_pack_name.replace(' Realm Pack', '')}..."
+        until_window = self.restock_schedule.seconds_until_window(time.time())
+        if until_window:
+            message += f" restock due in ~{until_window + self.restock_schedule.window_lead():.0f}s"
+        signals.log_updated.emit(message, "wait")
+
+    def restock_poll_interval(self, now):
+        """restock_idle_hz until the predicted restock window, restock_window_hz inside it, and
+        restock_watch_hz throughout while there is no schedule yet."""
+        until_window = self.restock_schedule.seconds_until_window(now)
+        if until_window is None:
+            return 1.0 / self.restock_watch_hz
+        if until_window == 0:
+            return 1.0 / self.restock_window_hz
+        return min(1.0 / self.restock_idle_hz, until_window)
+
+    def restock_seen(self, last_sample, sample):
+        """Records a restock for the schedule: stock was last seen empty at last_sample, if at all, and back at sample."""
+        if last_sample is not None:
+            self.restock_schedule.record(last_sample, sample)
+
+    def poll_restock(self, signals, watch):
+        """One restock poll; returns None once the pack is back in stock, otherwise the delay before the next poll."""
+        region = self.regions["PurchaseLocation"]
+        started = time.perf_counter()
+        now = time.time()
+        self.frame = self.capture_region(region)
+        sample = self.sample_region(region, self.frame)
+        self.metrics.counters["restock_polls"] += 1
+
+        if watch["reference"] is None or self.samples_differ(sample, watch["reference"]):
+            watch["reference"] = sample
+            if not self.is_pack_out_of_stock(signals):
+                self.restock_seen(watch["last_sample"], now)
+                return None
+        watch["last_sample"] = now
+        return max(0.0, self.restock_poll_interval(now) - (time.perf_counter() - started))
 
-        if self.running:
-            signals.log_updated.emit("SHOP RESTOCKED!", "success")
-            self.responsive_sleep(1, signals)
+    def watch_for_restock(self, signals):
+        """Polls PurchaseLocation until the pack is back in stock or the macro is stopped."""
+        watch = {"reference": None, "last_sample": None}
+        while self.running:
+            delay = self.poll_restock(signals, watch)
+            if delay is None:
+                return True
+            self.responsive_sleep(delay, signals)
+        return False
 
     def responsive_sleep(self, duration_secs, signals):
-        if duration_secs is None: return
-        steps = int(duration_secs / 0.05)
-        for _ in range(steps):
-            if not self.running:
-                return
-            time.sleep(0.05)
-        time.sleep(duration_secs % 0.05)
-
-    def macro_loop(self, signals, selected_packs):
-        self.sct = mss.mss()
+        if duration_secs is None or duration_secs <= 0: return
+        self.stop_event.wait(duration_secs)
 
-        if not selected_packs:
-            signals.log_updated.emit("No packs selected! Stopping.", "error")
-            return
+    def wait_until(self, predicate, timeout, poll_interval=0.05):
+        """Polls predicate until it holds, the timeout passes or the macro is stopped."""
+        deadline = time.perf_counter() + timeout
+        while self.running:
+            if predicate():
+                return True
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0 or self.stop_event.wait(min(poll_interval, remaining)):
+                return False
+        return False
 
-        pack_order = list(MainWindow.PACK_FULL_NAMES.values())
-        cycle = 1
+    def sample_region(self, region, frame=None):
+        if frame is None:
+            frame = self.capture_region(region)
+        return np.ascontiguousarray(frame.view(region)[::2, ::2, :3])
 
-        while self.running:
-            try:
-                signals.log_updated.emit(f"Cycle #{cycle} - Purchase Phase", "system")
-                if not self.logic_open_shop(signals):
-                    signals.log_updated.emit("Shop failed to open. Retrying cycle.", "error")
-                    self.responsive_sleep(5, signals)
-                    continue
+    def samples_differ(self, sample, reference):
+        return cv2.norm(sample, reference, cv2.NORM_L1) / sample.size > self.change_threshold
 
-                temp_pack_order = {name: i for i, name in enumerate(pack_order)}
-                packs_to_buy = sorted(selected_packs, key=lambda x: temp_pack_order.get(x, 99))
-                start_index = 0
-                if not self.initial_search:
-                    for i, pack in enumerate(packs_to_buy):
-                        if temp_pack_order.get(pack, 99) >= self.LastPackClicked:
-                            start_index = i
-                            break
-                reordered_packs = packs_to_buy[start_index:] + packs_to_buy[:start_index]
-
-                for pack_name in reordered_packs:
-                    if not self.running: break
-                    signals.log_updated.emit(f"Searching for {pack_name.replace(' Realm Pack', '')}...", "action")
-                    pack_found, scroll_attempts, max_scrolls = False, 0, 10
-
-                    if self.initial_search:
-                        if not self.search_and_click_pack(signals, pack_name):
-                            signals.log_updated.emit("Initial search failed. Resetting to top...", "info")
-                            for _ in range(2): self.scroll_in_pack_frame("up", 3)
-                            self.responsive_sleep(1, signals)
-
-                    while not pack_found and scroll_attempts < max_scrolls and self.running:
-                        pack_found = self.search_and_click_pack(signals, pack_name)
-                        if not pack_found:
-                            current_pack_index = pack_order.index(pack_name)
-                            scroll_dir = "down" if current_pack_index >= self.LastPackClicked else "up"
-                            signals.log_updated.emit(f"Scrolling {scroll_dir}...", "action")
-                            self.scroll_in_pack_frame(scroll_dir)
-                            scroll_attempts += 1
-                            self.responsive_sleep(1, signals)
-
-                    if not pack_found:
-                        signals.log_updated.emit(f"{pack_name.replace(' Realm Pack', '')} not found.", "error")
-                        continue
+    def wait_for_region_change(self, region, reference, timeout):
+        return self.wait_until(
+            lambda: self.samples_differ(self.sample_region(region), reference), timeout
+        )
 
-                    self.initial_search = False
-                    self.LastPackClicked = pack_order.index(pack_name)
-                    self.responsive_sleep(1, signals)
+    def wait_for_region_stable(self, region, timeout, settle=0.1):
+        deadline = time.perf_counter() + timeout
+        previous = self.sample_region(region)
+        while self.running and not self.stop_event.wait(settle):
+            sample = self.sample_region(region)
+            if not self.samples_differ(sample, previous):
+                return True
+            if time.perf_counter() >= deadline:
+                return False
+            previous = sample
+        return False
 
-                    if self.is_pack_out_of_stock(signals):
-                        signals.log_updated.emit(
-                            f"{pack_name.replace(' Realm Pack', '')} is out of stock.",
-                            "info",
-                        )
-                        continue
+    def macro_loop(self, signals, selected_packs):
+        if not self.start_session(signals, selected_packs):
+            return
 
-                    self.purchase_pack(signals, pack_name)
+        while self.running:
+            try:
+                with self.metrics.phase("classify"):
+                    observation = self.classify_ui_state(signals)
+                self.run_step(signals, observation)
+            except Exception as e:
+                signals.log_updated.emit(f"An unexpected error occurred: {str(e)}", "error")
+                self.responsive_sleep(1, signals)
 
-                    signals.log_updated.emit(
-                        f"{pack_name.replace(' Realm Pack', '')} fully purchased.",
-                        "success",
-                    )
+        self.end_session(signals)
 
-                    self.responsive_sleep(1, signals)
+    def start_session(self, signals, selected_packs):
+        if not selected_packs:
+            signals.log_updated.emit("No packs selected! Stopping.", "error")
+            return False
 
-                if self.running:
-                    signals.log_updated.emit("Purchase phase complete.", "success")
-                    close_attempts, max_close_attempts = 0, 5
-                    while self.running and self.is_summon_screen_open(signals) and close_attempts < max_close_attempts:
-                        if self.close_shop_with_image(signals):
-                            self.responsive_sleep(1.5, signals)
-                            break
-                        close_attempts += 1
-                        self.responsive_sleep(1, signals)
+        if self.record_dir:
+            session_dir = os.path.join(self.record_dir, time.strftime("%Y%m%d-%H%M%S"))
+            self.capture = RecordingCapture(self.capture, session_dir)
+            signals.log_updated.emit(f"Recording frames to {session_dir}", "system")
+        self.metrics = MacroMetrics()
+        if self.capture_fps:
+            self.grabber = FrameGrabber(self.capture, self.frame_region, self.capture_fps, metrics=self.metrics)
 
-                    if self.running:
-                        if not self.logic_sell_items(signals):
-                            signals.log_updated.emit("Failed to sell items.", "error")
+        self.selected_packs = selected_packs
+        self.cycle = 0
+        self.cycle_started = None
+        self.enter_phase(signals, "purchase")
+        return True
 
-                if self.running:
-                    self.wait_for_restock(signals)
-                cycle += 1
-            except Exception as e:
-                signals.log_updated.emit(f"An unexpected error occurred: {str(e)}", "error")
-                self.responsive_sleep(5, signals)
+    def run_step(self, signals, observation):
+        handler = self.transitions[(self.phase, observation.state)]
+        with self.metrics.phase(handler.__name__[len("step_"):]):
+            next_phase = handler(signals, observation)
+        if next_phase != self.phase:
+            self.enter_phase(signals, next_phase)
+
+    def end_session(self, signals):
+        if self.grabber:
+            self.grabber.close()
+            self.grabber = None
+        if isinstance(self.capture, RecordingCapture):
+            self.capture.close()
+            if self.capture.dropped:
+                signals.log_updated.emit(f"Recording fell behind and skipped {self.capture.dropped} frames.", "error")
+            self.capture = self.capture.source
+        else:
+            self.capture.close()
         signals.log_updated.emit("Macro stopped by user.", "system")
 
 
-class MainWindow(QMainWindow):
-    PACK_COLORS = {
-        'Dragon': "#d9534f", 'Sorcerer': '#6100ca', 'Pirate': '#f0ad4e',
-        'Demon': '#00e53d', 'Hunter': '#db2100', 'Shinobi': '#bcbcbc'
-    }
-    PACK_FULL_NAMES = {
-        'Dragon': 'Dragon Realm Pack', 'Sorcerer': 'Sorcerer Realm Pack', 'Pirate': 'Pirate Realm Pack',
-        'Demon': 'Demon Realm Pack', 'Hunter': 'Hunter Realm Pack', 'Shinobi': 'Shinobi Realm Pack'
-    }
+class AsyncMacroEngine:
+    """Runs the backend's state machine on an asyncio event loop, with blocking calls in a thread pool."""
 
-    def __init__(self, backend):
-        super().__init__()
+    def __init__(self, backend, workers=3):
         self.backend = backend
-        self.threadpool = QThreadPool()
-        self.pack_vars = {name: False for name in self.PACK_FULL_NAMES.values()}
-        self.current_start_hotkey = "f1"
-        self.current_stop_hotkey = "f2"
-        self.is_capturing_hotkey = None
-        self.pack_buttons = {}
-        self.dragPos = None
-        self.start_hotkey_ref = None
-        self.stop_hotkey_ref = None
+        self.workers = workers
+        self.loop = None
+        self.executor = None
+        self.travel_task = None
+        self.travel_target = None
+        self.moving = None
+
+    def run(self, signals, selected_packs):
+        asyncio.run(self.main(signals, selected_packs))
+
+    async def call(self, function, *args):
+        return await self.loop.run_in_executor(self.executor, function, *args)
+
+    async def main(self, signals, selected_packs):
+        backend = self.backend
+        self.loop = asyncio.get_running_loop()
+        self.executor = futures.ThreadPoolExecutor(self.workers)
+        coroutines = {"step_wait_restock": self.wait_restock}
+        if not await self.call(backend.start_session, signals, selected_packs):
+            self.executor.shutdown()
+            return
 
-        if getattr(sys, 'frozen', False):
-            self.config_file_path = os.path.join(os.path.dirname(sys.executable), 'config.json')
-        else:
-            self.config_file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.json')
+        backend.travel = self
+        try:
+            while backend.running:
+                try:
+                    observation = await self.observe(signals)
+                    handler = backend.transitions[(backend.phase, observation.state)]
+                    coroutine = coroutines.get(handler.__name__)
+                    if coroutine is None:
+                        await self.call(backend.run_step, signals, observation)
+                        continue
+                    with backend.metrics.phase(handler.__name__[len("step_"):]):
+                        next_phase = await coroutine(signals, observation)
+                    if next_phase != backend.phase:
+                        await self.call(backend.enter_phase, signals, next_phase)
+                except Exception as e:
+                    signals.log_updated.emit(f"An unexpected error occurred: {str(e)}", "error")
+                    await self.call(backend.responsive_sleep, 1, signals)
+        finally:
+            await self.stop_moving()
+            backend.travel = None
+            await self.call(backend.end_session, signals)
+            self.executor.shutdown()
+
+    async def observe(self, signals):
+        with self.backend.metrics.phase("classify"):
+            return await self.call(self.backend.classify_ui_state, signals)
+
+    async def wait_restock(self, signals, observation):
+        await self.call(self.backend.select_pack_to_watch, signals)
+        if await self.watch_stock(signals):
+            signals.log_updated.emit("SHOP RESTOCKED!", "success")
+            return "purchase"
+        return self.backend.phase
+
+    async def watch_stock(self, signals):
+        backend = self.backend
+        watch = {"reference": None, "last_sample": None}
+        while backend.running:
+            delay = await self.call(backend.poll_restock, signals, watch)
+            if delay is None:
+                return True
+            await asyncio.sleep(delay)
+        return False
 
-        self.setWindowFlags(Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint)
-        self.setAttribute(Qt.WA_TranslucentBackground) 
+    def start(self, x, y):
+        """Called from a step running in the pool: begins moving the cursor toward (x, y) in the background."""
+        asyncio.run_coroutine_threadsafe(self.begin_travel(x, y), self.loop).result()
+
+    def stop(self, target=None):
+        """Called from a step running in the pool: lets a travel already headed for target finish, else cancels it."""
+        asyncio.run_coroutine_threadsafe(self.end_travel(target), self.loop).result()
+
+    async def begin_travel(self, x, y):
+        await self.stop_moving()
+        self.travel_target = (x, y)
+        self.travel_task = asyncio.create_task(self.move_cursor(x, y))
+
+    async def end_travel(self, target):
+        task, destination = self.travel_task, self.travel_target
+        if task and target and destination and \
+                abs(destination[0] - target[0]) <= 8 and abs(destination[1] - target[1]) <= 8:
+            await task
+        await self.stop_moving()
+
+    async def stop_moving(self):
+        task, self.travel_task, self.travel_target = self.travel_task, None, None
+        if task:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        if self.moving:
+            await self.moving
+            self.moving = None
+
+    async def move_cursor(self, x, y):
+        backend = self.backend
+        start = await self.call(backend.input.position)
+        points, step_duration = backend.cursor_path(start[0], start[1], x, y)
+        for delay, point in backend.paced_path(points, step_duration, "human"):
+            if not backend.running:
+                break
+            await asyncio.sleep(max(0.0, delay))
+            self.moving = self.loop.run_in_executor(self.executor, backend.input.move_to, *point)
+            await asyncio.shield(self.moving)
+            self.moving = None
+        backend.mark_input()
+
+
+def find_game_windows(title="Roblox"):
+    """Client areas of visible top-level windows with this title, as coordinator window specs."""
+    windows = []
+
+    def visit(handle, _):
+        if win32gui.IsWindowVisible(handle) and win32gui.GetWindowText(handle) == title:
+            left, top = win32gui.ClientToScreen(handle, (0, 0))
+            _, _, width, height = win32gui.GetClientRect(handle)
+            windows.append({"rect": (left, top, width, height), "handle": handle})
+        return True
 
-        self.container = QWidget()
-        self.container_layout = QVBoxLayout(self.container)
-        self.container_layout.setContentsMargins(1, 1, 1, 1)
-        self.setCentralWidget(self.container)
+    win32gui.EnumWindows(visit, None)
+    return windows
 
-        self.initUI()
-        self.apply_styles()
-        QTimer.singleShot(0, self.deferred_init)
 
-    def deferred_init(self):
-        """Loads settings and sets up hotkeys after the UI is shown."""
-        self.load_settings()
-        self.setup_hotkeys()
-        self.update_pack_buttons()
+class CallbackSignal:
+    """The connect/emit part of a Qt Signal, so the backend can run without Qt."""
 
-    def initUI(self):
-        content_widget = QWidget()
-        content_widget.setObjectName("ContentWidget")
-        self.container_layout.addWidget(content_widget)
+    def __init__(self):
+        self.callbacks = []
 
-        main_layout = QVBoxLayout(content_widget)
-        main_layout.setSpacing(10)
-        main_layout.setContentsMargins(15, 0, 15, 15) 
+    def connect(self, callback):
+        self.callbacks.append(callback)
 
-        self.initTitleBar(main_layout)
+    def emit(self, *args):
+        for callback in self.callbacks:
+            callback(*args)
 
-        status_frame = QFrame()
-        status_frame.setObjectName("StatusFrame")
-        status_layout = QHBoxLayout(status_frame)
-        status_layout.setContentsMargins(10, 5, 10, 5)
-        
-        self.log_icon = QLabel("🟢")
-        self.log_icon.setFont(QFont("Segoe UI Emoji", 12))
-        self.log_text = QLabel("Ready to summon")
-        self.log_text.setObjectName("StatusText")
-        
-        status_layout.addWidget(self.log_icon)
-        status_layout.addWidget(self.log_text, 1)
-        main_layout.addWidget(status_frame)
-
-        pack_frame = QFrame()
-        pack_frame.setObjectName("SectionFrame")
-        pack_layout = QVBoxLayout(pack_frame)
-        pack_grid = QGridLayout()
-        pack_grid.setSpacing(8)
-        
-        for i, (short_name, color) in enumerate(self.PACK_COLORS.items()):
-            row, col = i // 2, i % 2
-            full_name = self.PACK_FULL_NAMES[short_name]
-            pack_btn = PackButton(short_name, color)
-            pack_btn.clicked.connect(lambda c=False, p=full_name: self.toggle_pack(p))
-            pack_grid.addWidget(pack_btn, row, col)
-            self.pack_buttons[full_name] = pack_btn
-            
-        pack_layout.addLayout(pack_grid)
-        main_layout.addWidget(pack_frame)
-
-        hotkey_frame = QFrame()
-        hotkey_frame.setObjectName("SectionFrame")
-        hotkey_layout = QGridLayout(hotkey_frame)
-        hotkey_layout.setSpacing(10)
-        hotkey_layout.setColumnStretch(1, 1)
-
-        hotkey_layout.addWidget(QLabel("Start Hotkey:"), 0, 0)
-        self.start_hotkey_btn = HotkeyCaptureButton()
-        self.start_hotkey_btn.setObjectName("HotkeySetBtn")
-        self.start_hotkey_btn.hotkey_captured.connect(lambda key: self._finalize_hotkey_capture('start', key))
-        hotkey_layout.addWidget(self.start_hotkey_btn, 0, 1)
-        
-        hotkey_layout.addWidget(QLabel("Stop Hotkey:"), 1, 0)
-        self.stop_hotkey_btn = HotkeyCaptureButton()
-        self.stop_hotkey_btn.setObjectName("HotkeySetBtn")
-        self.stop_hotkey_btn.hotkey_captured.connect(lambda key: self._finalize_hotkey_capture('stop', key))
-        hotkey_layout.addWidget(self.stop_hotkey_btn, 1, 1)
-        
-        main_layout.addWidget(hotkey_frame)
-
-        self.control_btn = QPushButton()
-        self.control_btn.setFixedHeight(40)
-        self.control_btn.clicked.connect(self.toggle_macro)
-        main_layout.addWidget(self.control_btn)
-
-        self.update_control_button_style()
-
-    def initTitleBar(self, parent_layout):
-        self.title_bar = QWidget()
-        self.title_bar.setObjectName("TitleBar")
-        self.title_bar.setFixedHeight(35)
-        title_layout = QHBoxLayout(self.title_bar)
-        title_layout.setContentsMargins(10, 0, 5, 0)
-        title_layout.setSpacing(5)
-
-        title_label = QLabel("⚔️ Anime Boss Raid Macro")
-        title_label.setFont(QFont("Segoe UI", 9, QFont.Bold))
-        title_label.setStyleSheet("color: #a9a9d9;")
-        title_layout.addWidget(title_label)
-        title_layout.addStretch()
-
-        btn_size = 28
-        
-        self.minimize_btn = QPushButton("\uE921")
-        self.minimize_btn.setObjectName("TitleBarButton")
-        self.minimize_btn.setFixedSize(btn_size, btn_size)
-        self.minimize_btn.clicked.connect(self.showMinimized)
-
-        self.close_btn = QPushButton("\uE8BB")
-        self.close_btn.setObjectName("TitleBarButton")
-        self.close_btn.setFixedSize(btn_size, btn_size)
-        self.close_btn.clicked.connect(self.close)
-
-        title_layout.addWidget(self.minimize_btn)
-        title_layout.addWidget(self.close_btn)
-
-        parent_layout.addWidget(self.title_bar)
-
-    def mousePressEvent(self, event):
-        if event.button() == Qt.LeftButton and self.title_bar.underMouse():
-            self.dragPos = event.globalPosition().toPoint()
-            event.accept()
-
-    def mouseMoveEvent(self, event):
-        if self.dragPos and event.buttons() == Qt.LeftButton:
-            self.move(self.pos() + event.globalPosition().toPoint() - self.dragPos)
-            self.dragPos = event.globalPosition().toPoint()
-            event.accept()
-
-    def mouseReleaseEvent(self, event):
-        self.dragPos = None
-        event.accept()
-
-    def apply_styles(self):
-        self.setStyleSheet("""
-            #ContentWidget {
-                background-color: #1e1e2d;
-                border: 1px solid #3c3c5a;
-                border-radius: 8px;
-            }
-            #TitleBar { background-color: transparent; }
-            #TitleBarButton {
-                background-color: transparent;
-                border: none; border-radius: 4px;
-                color: #e0e0e0; 
-                font-size: 10px;
-                font-family: 'Segoe Fluent Icons';
-            }
-            #TitleBarButton:hover { background-color: #4a4a5f; }
-            #TitleBarButton:pressed { background-color: #5a5a6f; }
-            #SectionFrame, #StatusFrame {
-                background-color: #2a2a3f;
-                border: 1px solid #3c3c5a;
-                border-radius: 8px; padding: 10px;
-            }
-            #StatusText, QLabel { font-size: 11px; font-weight: 500; }
-            #HotkeySetBtn {
-                background-color: #4a4a5f; border: 1px solid #666;
-                border-radius: 6px; padding: 8px;
-                font-size: 10px; font-weight: bold;
-            }
-            #HotkeySetBtn:hover { background-color: #5a5a6f; }
-            #StartButton {
-                background-color: #28a745; border: 1px solid #3cbf5d; color: white;
-            }
-            #StartButton:hover { background-color: #2ebf4f; }
-            #StopButton {
-                background-color: #dc3545; border: 1px solid #e45a66; color: white;
-            }
-            #StopButton:hover { background-color: #e44a59; }
-            #StartButton, #StopButton {
-                font-size: 11px; font-weight: bold;
-                border-radius: 8px; padding: 10px;
-                text-transform: uppercase;
-            }
-        """)
-
-    def toggle_macro(self):
-        if self.backend.running:
-            self.stop_macro()
-        else:
-            self.start_macro()
 
-    def update_control_button_style(self):
-        if self.backend.running:
-            self.control_btn.setObjectName("StopButton")
-            self.control_btn.setText("STOP")
-        else:
-            self.control_btn.setObjectName("StartButton")
-            self.control_btn.setText("START")
-        self.style().polish(self.control_btn)
-
-    @Slot(str, str)
-    def update_log(self, message, tag):
-        icons = {'success': '🟢', 'error': '🔴', 'action': '🔍', 'info': '📦', 'wait': '👀', 'system': '⚙️'}
-        self.log_icon.setText(icons.get(tag, '⚙️'))
-        self.log_text.setText(message)
-
-    def toggle_pack(self, pack_name):
-        self.pack_vars[pack_name] = not self.pack_vars[pack_name]
-        self.pack_buttons[pack_name].toggle_selection()
-
-    def update_pack_buttons(self):
-        for full_name, button in self.pack_buttons.items():
-            if self.pack_vars.get(full_name, False):
-                button.is_selected = True
-            button.update_style()
-
-    def start_macro(self):
-        if self.backend.running: return
+class CallbackSignals:
+    """Qt-free stand-in for gui.WorkerSignals."""
+
+    def __init__(self):
+        self.log_updated = CallbackSignal()
+        self.finished = CallbackSignal()
+
+
+def format_log(record, time_format="%H:%M:%S"):
+    _, timestamp, message, tag = record
+    return f"{time.strftime(time_format, time.localtime(timestamp))} [{tag}] {message}"
+
+
+class LogHistory:
+    """Bounded ring buffer of (sequence, time, message, tag) log records.
+
+    emit() only appends under a lock, so worker loops can log as often as they like; the UI and the
+    file writer each read what is new since the last sequence number they saw, at their own pace.
+    """
+
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self.records = collections.deque(maxlen=capacity)
+        self.sequence = 0
+        self.lock = threading.Lock()
+
+    def emit(self, message, tag):
+        with self.lock:
+            self.sequence += 1
+            self.records.append((self.sequence, time.time(), message, tag))
+
+    def since(self, sequence):
+        """Records newer than sequence, oldest first. Records that were overwritten are simply missing."""
+        with self.lock:
+            if not self.records or self.sequence <= sequence:
+                return []
+            start = max(0, sequence + 1 - self.records[0][0])
+            return list(itertools.islice(self.records, start, None))
+
+
+class LogFileWriter:
+    """Appends a LogHistory to a size-rotated file from a background thread, one batch per interval."""
+
+    def __init__(self, history, path, interval=1.0, max_bytes=1_000_000, backups=3):
+        self.history = history
+        self.path = path
+        self.interval = interval
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.sequence = history.sequence
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        records = self.history.since(self.sequence)
+        if not records:
+            return
+        lines = []
+        if records[0][0] > self.sequence + 1:
+            lines.append(f"... {records[0][0] - self.sequence - 1} log lines dropped before they were written")
+        lines += [format_log(record, "%Y-%m-%d %H:%M:%S") for record in records]
+        self.sequence = records[-1][0]
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            if os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+                self.rotate()
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+        except OSError as e:
+            print(f"Failed to write log: {e}")
+
+    def rotate(self):
+        for n in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{n}"):
+                os.replace(f"{self.path}.{n}", f"{self.path}.{n + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+    def close(self):
+        self.stop_event.set()
+        self.thread.join()
+
+
+class PrefixedSignals:
+    class _Log:
+        def __init__(self, log_updated, prefix):
+            self.log_updated = log_updated
+            self.prefix = prefix
+
+        def emit(self, message, tag):
+            self.log_updated.emit(self.prefix + message, tag)
+
+    def __init__(self, signals, prefix):
+        self.log_updated = self._Log(signals.log_updated, prefix)
+
+
+class MultiInstanceCoordinator:
+    """Drives one backend per game window, each on its own thread, with input through one InputArbiter."""
+
+    SHARED_SETTINGS = ("match_modes", "match_calibration", "purchase_mode", "click_rate", "max_overshoot",
+                       "capture_fps", "fast_cursor", "metrics_dir", "record_dir",
+                       "restock_watch_hz", "restock_idle_hz", "restock_window_hz")
+
+    def __init__(self, windows, device=None, settings_from=None):
+        self.arbiter = InputArbiter(device or DirectInput())
+        self.backends = []
+        for n, window in enumerate(windows, 1):
+            backend = RobloxMacroBackend()
+            backend.restock_schedule = RestockSchedule(os.path.join(backend.data_dir, f"restock{n}.json"))
+            if settings_from:
+                for name in self.SHARED_SETTINGS:
+                    value = getattr(settings_from, name)
+                    setattr(backend, name, dict(value) if isinstance(value, dict) else value)
+            backend.set_window(*window["rect"])
+            backend.input = self.arbiter.client(window.get("handle"))
+            self.backends.append(backend)
+
+    def run(self, signals, selected_packs, keep_running=lambda: True):
+        threads = []
+        for n, backend in enumerate(self.backends, 1):
+            if backend.metrics_dir:
+                backend.metrics_dir = os.path.join(backend.metrics_dir, f"instance{n}")
+            if backend.record_dir:
+                backend.record_dir = os.path.join(backend.record_dir, f"instance{n}")
+            backend.running = True
+            thread = threading.Thread(target=backend.macro_loop, daemon=True,
+                                      args=(PrefixedSignals(signals, f"[{n}] "), selected_packs))
+            thread.start()
+            threads.append(thread)
+
+        while any(thread.is_alive() for thread in threads):
+            if not keep_running():
+                self.stop()
+            for thread in threads:
+                thread.join(0.1)
+
+    def stop(self):
+        for backend in self.backends:
+            backend.running = False
+
+
+def run_macro(backend, signals, selected_packs):
+    """Runs until backend.running is cleared, with the engine or coordinator the settings ask for."""
+    if backend.instances:
+        windows = find_game_windows() if backend.instances == "auto" else backend.instances
+        signals.log_updated.emit(f"Driving {len(windows)} game windows.", "system")
+        coordinator = MultiInstanceCoordinator(windows, settings_from=backend)
+        coordinator.run(signals, selected_packs, lambda: backend.running)
+    elif backend.engine == "asyncio":
+        AsyncMacroEngine(backend).run(signals, selected_packs)
+    else:
+        backend.macro_loop(signals, selected_packs)
+
+
+def load_config(backend):
+    """Applies the backend settings from config.json and returns everything in it, including pack_vars and hotkeys."""
+    path = os.path.join(backend.data_dir, "config.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        settings = json.load(f)
+    backend.record_dir = settings.get("record_dir")
+    backend.metrics_dir = settings.get("metrics_dir")
+    backend.log_file = settings.get("log_file", backend.log_file)
+    backend.capture_fps = settings.get("capture_fps", backend.capture_fps)
+    backend.engine = settings.get("engine", backend.engine)
+    backend.fast_cursor = settings.get("fast_cursor", backend.fast_cursor)
+    rejected = backend.set_match_modes(settings.get("match_modes", {}), settings.get("match_calibration", {}))
+    for key, mode in rejected.items():
+        print(f"Ignoring match mode {mode!r} for {key}: non-matches score at or above "
+              f"{backend.MATCH_CONFIDENCE} or it was never calibrated.")
+    backend.instances = settings.get("instances")
+    purchase = settings.get("purchase", {})
+    backend.purchase_mode = purchase.get("mode", backend.purchase_mode)
+    backend.click_rate = purchase.get("click_rate", backend.click_rate)
+    backend.max_overshoot = purchase.get("max_overshoot", backend.max_overshoot)
+    restock = settings.get("restock", {})
+    backend.restock_watch_hz = restock.get("watch_hz", backend.restock_watch_hz)
+    backend.restock_idle_hz = restock.get("idle_hz", backend.restock_idle_hz)
+    backend.restock_window_hz = restock.get("window_hz", backend.restock_window_hz)
+    return settings
+
+
+def save_config(backend, pack_vars, start_hotkey, stop_hotkey):
+    settings = {
+        "pack_vars": pack_vars,
+        "hotkeys": {"start": start_hotkey, "stop": stop_hotkey},
+        "purchase": {"mode": backend.purchase_mode, "click_rate": backend.click_rate,
+                     "max_overshoot": backend.max_overshoot},
+        "restock": {"watch_hz": backend.restock_watch_hz, "idle_hz": backend.restock_idle_hz,
+                    "window_hz": backend.restock_window_hz},
+    }
+    if backend.record_dir:
+        settings["record_dir"] = backend.record_dir
+    if backend.metrics_dir:
+        settings["metrics_dir"] = backend.metrics_dir
+    if backend.log_file != os.path.join(backend.data_dir, "logs", "macro.log"):
+        settings["log_file"] = backend.log_file
+    if backend.capture_fps:
+        settings["capture_fps"] = backend.capture_fps
+    if backend.engine != "threaded":
+        settings["engine"] = backend.engine
+    if backend.fast_cursor:
+        settings["fast_cursor"] = True
+    if backend.match_modes:
+        settings["match_modes"] = backend.match_modes
+    if backend.match_calibration:
+        settings["match_calibration"] = backend.match_calibration
+    if backend.instances:
+        settings["instances"] = backend.instances
+    with open(os.path.join(backend.data_dir, "config.json"), "w") as f:
+        json.dump(settings, f, indent=2)
+
+
+class HeadlessRunner:
+    """Runs the macro from a terminal with the packs and hotkeys saved in config.json, without loading Qt.
+
+    The macro starts right away. The stop hotkey pauses it, the start hotkey resumes it and Ctrl+C exits.
+    Log lines go into a LogHistory; the main thread prints them a batch at a time and a LogFileWriter
+    appends them to backend.log_file.
+    """
+
+    def __init__(self, backend, selected_packs, start_hotkey="f1", stop_hotkey="f2", print_interval=0.2):
+        self.backend = backend
+        self.selected_packs = selected_packs
+        self.start_hotkey = start_hotkey
+        self.stop_hotkey = stop_hotkey
+        self.print_interval = print_interval
+        self.worker = None
+        self.history = LogHistory()
+        self.printed = 0
+        self.signals = CallbackSignals()
+        self.signals.log_updated.connect(self.history.emit)
+        self.log = self.signals.log_updated.emit
+
+    def print_new_lines(self):
+        records = self.history.since(self.printed)
+        if records:
+            self.printed = records[-1][0]
+            print("\n".join(format_log(record) for record in records), flush=True)
+
+    def start(self):
+        if self.backend.running or (self.worker and self.worker.is_alive()): return
         self.backend.running = True
-        self.update_log("Macro started.", 'system')
-        
-        selected_packs = [name for name, selected in self.pack_vars.items() if selected]
-        worker = MacroWorker(self.backend, selected_packs)
-        worker.signals.log_updated.connect(self.update_log)
-        worker.signals.finished.connect(self.on_macro_finished)
-        self.threadpool.start(worker)
-        self.update_control_button_style()
-
-    def stop_macro(self):
+        self.log("Macro started.", "system")
+        worker = threading.Thread(target=self.run_worker, daemon=True)
+        worker.start()
+        self.worker = worker
+
+    def run_worker(self):
+        run_macro(self.backend, self.signals, self.selected_packs)
+        self.backend.running = False
+        self.signals.finished.emit()
+
+    def stop(self):
         if self.backend.running:
             self.backend.running = False
-            self.update_log("Stopping macro...", 'system')
-    
-    @Slot()
-    def on_macro_finished(self):
-        self.backend.running = False
-        self.update_control_button_style()
+            self.log("Stopping macro...", "system")
 
-    def _finalize_hotkey_capture(self, target, hotkey):
-        if target == 'start' and hotkey == self.current_stop_hotkey:
-            self.update_log("Hotkey is already in use for Stop.", 'error')
-        elif target == 'stop' and hotkey == self.current_start_hotkey:
-            self.update_log("Hotkey is already in use for Start.", 'error')
-        else:
-            if target == 'start':
-                self.current_start_hotkey = hotkey
-            else:
-                self.current_stop_hotkey = hotkey
-            self.update_log(f"{target.capitalize()} hotkey set to '{hotkey.upper()}'", 'success')
-        
-        self.setup_hotkeys()
+    def run(self):
+        writer = LogFileWriter(self.history, self.backend.log_file)
+        hotkey_refs = []
+        try:
+            hotkey_refs.append(keyboard.add_hotkey(self.start_hotkey, self.start))
+            hotkey_refs.append(keyboard.add_hotkey(self.stop_hotkey, self.stop))
+            self.log(f"{self.stop_hotkey.upper()} pauses, {self.start_hotkey.upper()} resumes, "
+                     f"Ctrl+C exits.", "system")
+        except Exception as e:
+            self.log(f"Hotkeys unavailable ({e}); stop with Ctrl+C.", "error")
 
-    def setup_hotkeys(self):
-        if self.start_hotkey_ref:
-            try: keyboard.remove_hotkey(self.start_hotkey_ref)
-            except (KeyError, ValueError): pass
-        if self.stop_hotkey_ref:
-            try: keyboard.remove_hotkey(self.stop_hotkey_ref)
+        self.start()
+        try:
+            # Without hotkeys nothing can resume a finished run, so exit with it.
+            # Sleep rather than join: Ctrl+C during Thread.join can leave the thread looking finished.
+            while hotkey_refs or self.worker.is_alive():
+                time.sleep(self.print_interval)
+                self.print_new_lines()
+        except KeyboardInterrupt:
+            self.stop()
+            self.worker.join(5)
+        for ref in hotkey_refs:
+            try: keyboard.remove_hotkey(ref)
             except (KeyError, ValueError): pass
+        self.print_new_lines()
+        writer.close()
 
-        self.start_hotkey_ref = keyboard.add_hotkey(self.current_start_hotkey, self.start_macro)
-        self.stop_hotkey_ref = keyboard.add_hotkey(self.current_stop_hotkey, self.stop_macro)
-        
-        self.start_hotkey_btn.setText(self.current_start_hotkey.upper())
-        self.stop_hotkey_btn.setText(self.current_stop_hotkey.upper())
 
-    def save_settings(self):
-        settings = {
-            'pack_vars': self.pack_vars,
-            'hotkeys': {'start': self.current_start_hotkey, 'stop': self.current_stop_hotkey},
-        }
-        try:
-            with open(os.path.join(self.backend.script_dir, 'config.json'), 'w') as f:
-                json.dump(settings, f, indent=2)
-        except Exception as e: print(f"Failed to save settings: {e}")
+def run_headless(packs=None):
+    backend = RobloxMacroBackend()
+    settings = load_config(backend)
+    if packs:
+        selected_packs = [PACK_FULL_NAMES[name] for name in packs]
+    else:
+        selected_packs = [name for name, selected in settings.get("pack_vars", {}).items() if selected]
+    hotkeys = settings.get("hotkeys", {})
+    HeadlessRunner(backend, selected_packs, hotkeys.get("start", "f1"), hotkeys.get("stop", "f2")).run()
 
-    def load_settings(self):
-        try:
-            path = os.path.join(self.backend.script_dir, 'config.json')
-            if os.path.exists(path):
-                with open(path, 'r') as f:
-                    settings = json.load(f)
-                    self.pack_vars = settings.get('pack_vars', self.pack_vars)
-                    hotkeys = settings.get('hotkeys', {})
-                    self.current_start_hotkey = hotkeys.get('start', 'f1')
-                    self.current_stop_hotkey = hotkeys.get('stop', 'f2')
-        except Exception as e: print(f"Failed to load settings: {e}")
-
-    def closeEvent(self, event):
-        self.save_settings()
-        self.backend.running = False
-        
-        if self.start_hotkey_ref:
-            try: keyboard.remove_hotkey(self.start_hotkey_ref)
-            except (KeyError, ValueError): pass
-        if self.stop_hotkey_ref:
-            try: keyboard.remove_hotkey(self.stop_hotkey_ref)
-            except (KeyError, ValueError): pass
-            
-        event.accept()
 
-def main():
-    app = QApplication(sys.argv)
+def build_template_bundle():
     backend = RobloxMacroBackend()
-    window = MainWindow(backend)
-    window.show()
-    sys.exit(app.exec())
+    backend.templates = TemplateStore()
+    backend.load_image_templates(use_bundle=False)
+    backend.templates.save_bundle(backend.template_bundle, backend.template_sources())
+    print(f"Wrote {len(backend.templates)} templates to {backend.template_bundle}.npy")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Anime Boss Raid pack macro. Opens the window unless --headless.")
+    parser.add_argument("--headless", action="store_true",
+                        help="run in this terminal with the packs and hotkeys saved in config.json")
+    parser.add_argument("--packs", nargs="+", choices=list(PACK_FULL_NAMES),
+                        help="with --headless, buy these packs instead of the saved selection")
+    parser.add_argument("--build-template-bundle", action="store_true",
+                        help="precompile images/*.png into images/templates.npy and exit")
+    args, _ = parser.parse_known_args()
+
+    if args.build_template_bundle:
+        build_template_bundle()
+    elif args.headless:
+        run_headless(args.packs)
+    else:
+        # Run as a script this module is __main__; register it as "macro" so gui's import reuses it
+        # instead of executing the file a second time with its own backend globals and lazy modules.
+        sys.modules.setdefault("macro", sys.modules[__name__])
+        import gui
+        gui.main()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
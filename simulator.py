@@ -0,0 +1,321 @@
+import collections
+import contextlib
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from macro import PACK_FULL_NAMES, FrameSnapshot, MultiInstanceCoordinator, RestockSchedule, RobloxMacroBackend
+
+SCREEN_SIZE = (1920, 1080)
+
+
+class ShopSimulator:
+    """A headless stand-in for the game screens the macro drives.
+
+    Screens are composed from the bundled template images at positions inside the
+    backend's regions, and change in response to SimulatedInput the way the game does:
+    the summon and sell buttons teleport, "e" opens the menu you stand at, pack tiles
+    select a pack, the purchase button buys while stock lasts and stock refills on a fixed
+    schedule every restock_period seconds. restocks holds the restock times and restock_delays,
+    per restock, the time until the first pack bought after it.
+    """
+
+    PACK_SPACING = 150
+    SCROLL_STEP = 40
+
+    def __init__(self, image_dir, regions, stock_per_pack=3, restock_period=4.0, latency=0.15, seed=0):
+        self.regions = regions
+        self.stock_per_pack = stock_per_pack
+        self.restock_period = restock_period
+        self.latency = latency
+        self.lock = threading.RLock()
+        self.images = {}
+        for filename in os.listdir(image_dir):
+            if filename.lower().endswith(".png"):
+                image = cv2.imread(os.path.join(image_dir, filename), cv2.IMREAD_UNCHANGED)
+                self.images[os.path.splitext(filename)[0]] = cv2.cvtColor(image[:, :, :3], cv2.COLOR_BGR2BGRA)
+
+        rng = np.random.default_rng(seed)
+        noise = rng.integers(25, 70, (SCREEN_SIZE[1] // 16, SCREEN_SIZE[0] // 16, 3), dtype=np.uint8)
+        self.background = cv2.cvtColor(cv2.resize(noise, SCREEN_SIZE, interpolation=cv2.INTER_LINEAR),
+                                       cv2.COLOR_BGR2BGRA)
+        panel = rng.integers(55, 95, (SCREEN_SIZE[1] // 8, SCREEN_SIZE[0] // 8, 3), dtype=np.uint8)
+        self.panel = cv2.cvtColor(cv2.resize(panel, SCREEN_SIZE, interpolation=cv2.INTER_LINEAR),
+                                  cv2.COLOR_BGR2BGRA)
+
+        self.pack_names = list(PACK_FULL_NAMES.values())
+        self.layout = self._layout()
+        self.screen = "world"
+        self.standing_at = None
+        self.pending = None
+        self.scroll_offset = 0
+        self.max_scroll = max(0, 40 + len(self.pack_names) * self.PACK_SPACING - regions["PackFrame"][3])
+        self.selected_pack = None
+        self.stock = {name: stock_per_pack for name in self.pack_names}
+        self.next_restock = time.perf_counter() + restock_period
+        self.last_restock = None
+        self.restocks = []
+        self.restock_delays = []
+        self.stats = collections.Counter()
+        self._frame = None
+
+    def _layout(self):
+        def inside(region, template, dx=0.5, dy=0.5):
+            height, width = self.images[template].shape[:2]
+            return (region[0] + int((region[2] - width) * dx), region[1] + int((region[3] - height) * dy))
+
+        sell_inv_h, sell_inv_w = self.images["SellInv"].shape[:2]
+        click_x, click_y = self.regions["SellInvClick"]
+        return {
+            "SummonButton": inside(self.regions["SummonButton"], "SummonButton", 0.1),
+            "SellButton": inside(self.regions["SellButton"], "SellButton", 0.1),
+            "SummonScreen": inside(self.regions["SummonScreen"], "SummonScreen"),
+            "XButton": inside(self.regions["XButton"], "XButton"),
+            "NoStock": inside(self.regions["PurchaseLocation"], "NoStock"),
+            "SellInv": (click_x - sell_inv_w // 2, click_y - sell_inv_h // 2),
+        }
+
+    def _hit(self, name, x, y):
+        left, top = self.layout[name]
+        height, width = self.images[name].shape[:2]
+        return left <= x < left + width and top <= y < top + height
+
+    def _pack_tiles(self):
+        frame_x, frame_y, frame_w, frame_h = self.regions["PackFrame"]
+        for i, name in enumerate(self.pack_names):
+            image = self.images[name.replace(" ", "")]
+            x = frame_x + 40
+            y = frame_y + 20 + i * self.PACK_SPACING - self.scroll_offset
+            if y >= frame_y and y + image.shape[0] <= frame_y + frame_h:
+                yield name, image, x, y
+
+    def _update(self):
+        now = time.perf_counter()
+        if now >= self.next_restock:
+            self.stock = {name: self.stock_per_pack for name in self.pack_names}
+            while self.next_restock <= now:
+                self.last_restock = self.next_restock
+                self.next_restock += self.restock_period
+            self.restocks.append(self.last_restock)
+            self._frame = None
+        if self.pending and now >= self.pending[1]:
+            self.screen = self.pending[0]
+            self.pending = None
+            self._frame = None
+
+    def _render(self):
+        frame = self.background.copy()
+
+        def put(name, position):
+            image = self.images[name]
+            x, y = position
+            frame[y:y + image.shape[0], x:x + image.shape[1]] = image
+
+        put("SummonButton", self.layout["SummonButton"])
+        put("SellButton", self.layout["SellButton"])
+        if self.screen == "shop":
+            frame_x, frame_y, frame_w, frame_h = self.regions["PackFrame"]
+            frame[frame_y:frame_y + frame_h, frame_x:frame_x + frame_w] = \
+                self.panel[frame_y:frame_y + frame_h, frame_x:frame_x + frame_w]
+            put("SummonScreen", self.layout["SummonScreen"])
+            put("XButton", self.layout["XButton"])
+            for _, image, x, y in self._pack_tiles():
+                frame[y:y + image.shape[0], x:x + image.shape[1]] = image
+            if self.selected_pack and self.stock[self.selected_pack] <= 0:
+                put("NoStock", self.layout["NoStock"])
+            elif self.selected_pack:
+                buy_x, buy_y, buy_w, buy_h = self.regions["PurchaseLocation"]
+                cv2.rectangle(frame, (buy_x + 20, buy_y + 6), (buy_x + buy_w - 20, buy_y + buy_h - 6),
+                              (60, 180, 60, 255), -1)
+        elif self.screen == "sell":
+            put("SellInv", self.layout["SellInv"])
+        return frame
+
+    def grab(self, region):
+        with self.lock:
+            self._update()
+            if self._frame is None:
+                self._frame = self._render()
+            left, top, width, height = region
+            return self._frame[top:top + height, left:left + width].copy()
+
+    def click(self, x, y):
+        with self.lock:
+            self._update()
+            self.stats["clicks"] += 1
+            if self.screen in ("world", "sell") and self._hit("SummonButton", x, y):
+                self.screen, self.standing_at = "world", "shop"
+            elif self.screen in ("world", "sell") and self._hit("SellButton", x, y):
+                self.screen, self.standing_at = "world", "sell"
+            elif self.screen == "shop" and self._hit("XButton", x, y):
+                self.screen, self.selected_pack = "world", None
+            elif self.screen == "shop" and self._click_pack(x, y):
+                pass
+            elif self.screen == "shop" and self._in_region("PurchaseLocation", x, y) and self.selected_pack \
+                    and self.stock[self.selected_pack] > 0:
+                self.stock[self.selected_pack] -= 1
+                self.stats["packs_bought"] += 1
+                if self.last_restock is not None:
+                    self.restock_delays.append(time.perf_counter() - self.last_restock)
+                    self.last_restock = None
+            elif self.screen == "sell" and abs(x - self.regions["SellInvClick"][0]) <= 10 \
+                    and abs(y - self.regions["SellInvClick"][1]) <= 10:
+                self.stats["sell_clicks"] += 1
+            else:
+                self.stats["wasted_clicks"] += 1
+                return
+            self._frame = None
+
+    def _in_region(self, name, x, y):
+        left, top, width, height = self.regions[name]
+        return left <= x < left + width and top <= y < top + height
+
+    def _click_pack(self, x, y):
+        for name, image, tile_x, tile_y in self._pack_tiles():
+            if tile_x <= x < tile_x + image.shape[1] and tile_y <= y < tile_y + image.shape[0]:
+                self.selected_pack = name
+                return True
+        return False
+
+    def key(self, key):
+        with self.lock:
+            self._update()
+            self.stats["keys"] += 1
+            if key == "e" and self.screen == "world" and self.standing_at and not self.pending:
+                self.pending = (self.standing_at, time.perf_counter() + self.latency)
+            else:
+                self.stats["wasted_keys"] += 1
+
+    def scroll(self, x, y, notches):
+        with self.lock:
+            self._update()
+            self.stats["scrolls"] += 1
+            if self.screen != "shop" or not self._in_region("PackFrame", x, y):
+                self.stats["wasted_scrolls"] += 1
+                return
+            offset = min(self.max_scroll, max(0, self.scroll_offset - notches * self.SCROLL_STEP))
+            if offset == self.scroll_offset:
+                self.stats["wasted_scrolls"] += 1
+            self.scroll_offset = offset
+            self._frame = None
+
+
+class SimulatedCapture:
+    """Serves grabs from a simulator whose window starts at origin on the (virtual) desktop."""
+
+    def __init__(self, simulator, origin=(0, 0)):
+        self.simulator = simulator
+        self.origin = origin
+
+    def grab(self, region):
+        timestamp = time.perf_counter()
+        local = (region[0] - self.origin[0], region[1] - self.origin[1], region[2], region[3])
+        return FrameSnapshot(region[0], region[1], self.simulator.grab(local), timestamp)
+
+    def close(self):
+        pass
+
+
+class SimulatedInput:
+    """Replaces DirectInput: moves are recorded and clicks, keys and wheel events go to the simulator."""
+
+    def __init__(self, simulator):
+        self.simulator = simulator
+        self.cursor = (0, 0)
+        self.held = set()
+
+    def position(self):
+        return self.cursor
+
+    def move_to(self, x, y, duration=0.0):
+        if duration:
+            time.sleep(duration)
+        self.cursor = (int(x), int(y))
+
+    def click(self):
+        self.simulator.click(*self.cursor)
+
+    def key_down(self, key):
+        self.held.add(key)
+
+    def key_up(self, key):
+        if key in self.held:
+            self.held.discard(key)
+            self.simulator.key(key)
+
+    def scroll(self, x, y, notches):
+        self.simulator.scroll(x, y, notches)
+
+    def focus(self, window_handle):
+        pass
+
+    def turn(self):
+        return contextlib.nullcontext()
+
+
+class SimulatedDesktop(SimulatedInput):
+    """One mouse and keyboard over several simulator windows side by side on a virtual desktop.
+
+    Clicks and wheel events go to the window under the cursor, keys to the focused window.
+    """
+
+    def __init__(self):
+        super().__init__(None)
+        self.windows = []
+
+    def add(self, simulator, origin):
+        self.windows.append((simulator, origin))
+
+    def _under(self, x, y):
+        for simulator, (left, top) in self.windows:
+            if left <= x < left + SCREEN_SIZE[0] and top <= y < top + SCREEN_SIZE[1]:
+                return simulator, x - left, y - top
+        return None, x, y
+
+    def click(self):
+        simulator, x, y = self._under(*self.cursor)
+        if simulator:
+            simulator.click(x, y)
+
+    def key_up(self, key):
+        if key in self.held:
+            self.held.discard(key)
+            if self.simulator:
+                self.simulator.key(key)
+
+    def scroll(self, x, y, notches):
+        simulator, x, y = self._under(x, y)
+        if simulator:
+            simulator.scroll(x, y, notches)
+
+    def focus(self, window_handle):
+        self.simulator = window_handle
+
+
+def simulated_coordinator(count, **options):
+    """A MultiInstanceCoordinator over count simulators placed side by side, each a full 1920x1080 window."""
+    desktop = SimulatedDesktop()
+    layout = RobloxMacroBackend()
+    windows, simulators = [], []
+    for n in range(count):
+        simulator = ShopSimulator(layout.image_dir, layout.base_regions, seed=n, **options)
+        origin = (n * SCREEN_SIZE[0], 0)
+        desktop.add(simulator, origin)
+        windows.append({"rect": (*origin, *SCREEN_SIZE), "handle": simulator})
+        simulators.append(simulator)
+    coordinator = MultiInstanceCoordinator(windows, device=desktop)
+    for backend, simulator, window in zip(coordinator.backends, simulators, windows):
+        backend.capture = SimulatedCapture(simulator, window["rect"][:2])
+        backend.restock_schedule = RestockSchedule()
+    return coordinator, simulators
+
+
+def attach_simulator(backend, **options):
+    simulator = ShopSimulator(backend.image_dir, backend.regions, **options)
+    backend.capture = SimulatedCapture(simulator)
+    backend.input = SimulatedInput(simulator)
+    backend.restock_schedule = RestockSchedule()
+    return simulator
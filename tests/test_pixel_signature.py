@@ -0,0 +1,34 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from macro import PixelSignature
+
+
+def thumbnails():
+    base = np.full((48, 220, 4), 80, np.uint8)
+    overlay = base.copy()
+    overlay[20:28, 100:120, :3] = 140
+    signature = PixelSignature(verify_every=3, verify_interval=100.0)
+    return signature, signature.thumbnail(base), signature.thumbnail(overlay)
+
+
+def test_due_after_verify_every_hits():
+    signature, hidden, _ = thumbnails()
+    signature.learn(hidden, False)
+    assert not signature.due()
+    signature.hits_since_check = 3
+    assert signature.due()
+    signature.learn(hidden, False)
+    assert not signature.due()
+
+
+def test_full_match_drops_disagreeing_thumbnail():
+    signature, hidden, shown = thumbnails()
+    signature.learn(hidden, False)
+    assert signature.classify(shown) is False
+    signature.learn(shown, True)
+    assert len(signature.seen[False]) == 0
+    assert signature.classify(shown) is True
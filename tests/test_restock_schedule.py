@@ -0,0 +1,55 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from macro import RestockSchedule
+
+PERIOD, PHASE = 60.0, 7.0
+
+
+def fitted_schedule(periods, jitter=()):
+    schedule = RestockSchedule()
+    jitter = list(jitter) + [0.0] * len(periods)
+    schedule.times = [1_000_020.0 + PHASE + k * PERIOD + offset for k, offset in zip(periods, jitter)]
+    schedule.estimate()
+    return schedule
+
+
+def test_fits_period_across_missed_restocks():
+    schedule = fitted_schedule([0, 1, 3, 4, 7, 11], jitter=[0.3, -0.2, 0.1, -0.3, 0.2, 0.0])
+    assert schedule.period == pytest.approx(PERIOD, abs=0.1)
+    next_restock = 1_000_020.0 + PHASE + 12 * PERIOD
+    now = next_restock - 30
+    assert now + schedule.seconds_until_window(now) + schedule.window_lead() == pytest.approx(next_restock, abs=0.5)
+
+
+def test_too_few_sightings_predict_nothing():
+    schedule = fitted_schedule([0, 2, 5])
+    assert schedule.period is None
+    assert schedule.seconds_until_window(1_000_000.0) is None
+
+
+def test_irregular_sightings_predict_nothing():
+    schedule = RestockSchedule()
+    schedule.times = [0.0, 60.0, 95.0, 181.0, 230.0, 333.0]
+    schedule.estimate()
+    assert schedule.period is None
+
+
+def test_window_before_inside_and_after():
+    schedule = fitted_schedule([0, 1, 2, 4, 5])
+    lead = schedule.window_lead()
+    restock = schedule.times[-1] + 3 * PERIOD
+    assert schedule.seconds_until_window(restock - lead - 10) == pytest.approx(10.0)
+    assert schedule.seconds_until_window(restock - lead / 2) == 0.0
+    assert schedule.seconds_until_window(restock + lead / 2) == 0.0
+    assert schedule.seconds_until_window(restock + lead + 5) == pytest.approx(PERIOD - 2 * lead - 5)
+
+
+def test_uncertain_sighting_is_not_recorded():
+    schedule = RestockSchedule()
+    schedule.record(100.0, 103.0)
+    schedule.record(200.0, 201.0)
+    assert schedule.times == [200.5]
@@ -0,0 +1,37 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from macro import RobloxMacroBackend
+
+
+def scrolled_backend(pixels_per_notch):
+    backend = RobloxMacroBackend()
+    backend.pack_content_y = {"Dragon Realm Pack": 300.0}
+    backend.scroll_offset = 120.0
+    backend.pending_scroll = (0.0, 3)
+    backend.pixels_per_notch = pixels_per_notch
+    return backend
+
+
+def test_zero_move_before_first_measurement():
+    backend = scrolled_backend(None)
+    backend.remember_pack_positions({"Dragon Realm Pack": ((700, 300), 0.95)})
+    assert backend.pixels_per_notch is None
+    assert backend.pending_scroll is None
+    assert backend.scroll_offset == 0.0
+
+
+def test_zero_move_keeps_learned_notch_size():
+    backend = scrolled_backend(40.0)
+    backend.remember_pack_positions({"Dragon Realm Pack": ((700, 300), 0.95)})
+    assert backend.pixels_per_notch == 40.0
+    assert backend.pending_scroll is None
+
+
+def test_first_measurement_sets_notch_size():
+    backend = scrolled_backend(None)
+    backend.remember_pack_positions({"Dragon Realm Pack": ((700, 180), 0.95)})
+    assert backend.pixels_per_notch == 40.0
+    assert backend.scroll_offset == 120.0
+    assert backend.pending_scroll is None